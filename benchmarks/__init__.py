@@ -0,0 +1,7 @@
+"""Benchmarks for the client-side hot path of vector_prisma.
+
+Run ``python -m benchmarks --help``. By default every scenario runs against
+an in-process stand-in for the Prisma query engine, which measures the
+overhead the client adds per call; ``--database-url`` runs them against a
+local PostgreSQL with pgvector instead.
+"""
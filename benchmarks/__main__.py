@@ -0,0 +1,138 @@
+"""Run the benchmark scenarios and report timings as JSON.
+
+Usage:
+    python -m benchmarks [--scenario NAME ...] [--repeat N] [--output FILE]
+                         [--database-url postgresql://...] [--keep-tables]
+
+Without ``--database-url`` the scenarios run against the in-process fake
+backend. The JSON report goes to ``--output`` (or stdout) and a summary
+table to stderr, so reports can be collected per release and compared.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+import vector_prisma
+
+from .backends import make_backend
+from .scenarios import MICRO_SCENARIOS, SCENARIOS, Call, Scenario
+
+
+async def _measure(call: Call, repeat: int, number: int) -> list[float]:
+    """Seconds per call for each of `repeat` samples of `number` calls."""
+    await call()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await call()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def _summary(scenario: Scenario, samples: list[float]) -> dict[str, Any]:
+    ordered = sorted(samples)
+    return {
+        "name": scenario.name,
+        "dim": scenario.dim,
+        "rows": scenario.rows,
+        "repeat": len(samples),
+        "number": scenario.number,
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+        "ops_per_sec": 1 / statistics.median(ordered),
+        "rows_per_sec": (
+            scenario.result_rows / statistics.median(ordered)
+            if scenario.result_rows
+            else None
+        ),
+    }
+
+
+async def run(
+    names: list[str],
+    repeat: Optional[int],
+    database_url: Optional[str],
+    keep_tables: bool,
+) -> dict[str, Any]:
+    scenarios = [
+        scenario
+        for scenario in (*MICRO_SCENARIOS, *SCENARIOS)
+        if not names or scenario.name in names
+    ]
+    backend = make_backend(database_url)
+    await backend.connect()
+    results = []
+    try:
+        for scenario in scenarios:
+            call = await scenario.prepare(backend, scenario)
+            samples = await _measure(call, repeat or scenario.repeat, scenario.number)
+            results.append(_summary(scenario, samples))
+            rows_per_sec = results[-1]["rows_per_sec"]
+            print(
+                f"{scenario.name:<24} {results[-1]['median_ms']:10.3f} ms "
+                f"(p95 {results[-1]['p95_ms']:.3f} ms)"
+                + (f" {rows_per_sec:12,.0f} rows/s" if rows_per_sec else ""),
+                file=sys.stderr,
+            )
+    finally:
+        await backend.close(keep_tables)
+
+    return {
+        "backend": backend.name,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "vector_prisma": vector_prisma.__version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main() -> None:
+    names = [scenario.name for scenario in (*MICRO_SCENARIOS, *SCENARIOS)]
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=names,
+        default=[],
+        help="run only these scenarios (repeatable)",
+    )
+    parser.add_argument("--repeat", type=int, help="samples per scenario")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument(
+        "--database-url",
+        help="run against PostgreSQL with pgvector (requires asyncpg)",
+    )
+    parser.add_argument(
+        "--keep-tables",
+        action="store_true",
+        help="do not drop the benchmark tables afterwards",
+    )
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run(args.scenario, args.repeat, args.database_url, args.keep_tables)
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Backends the scenarios run against.
+
+`FakeBackend` answers `query_raw` / `execute_raw` in process from canned
+responses, so a scenario measures query building, parameter and result
+serialization, vector decoding and model parsing without a database.
+`PostgresBackend` runs the same statements on a real database through
+`NativeEngine`.
+"""
+
+import json
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from prisma._raw_query import deserialize_raw_results
+
+from vector_prisma import codec
+from vector_prisma.engine import NativeEngine, PrismaEngine, VectorEngine
+from vector_prisma.queries import quote_ident
+
+# Types of the raw result columns, as reported by the Prisma query engine.
+_RAW_TYPES = {str: "string", float: "double", int: "bigint", bool: "bool"}
+
+
+def make_vectors(count: int, dim: int, seed: int = 0) -> codec.FloatArray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def make_rows(count: int, dim: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Rows of the benchmark table, with vectors as float32 arrays."""
+    return [
+        {"id": f"item-{i}", "body": f"body {i}", "vec": vec}
+        for i, vec in enumerate(make_vectors(count, dim, seed))
+    ]
+
+
+def as_text_rows(
+    rows: Sequence[dict[str, Any]], distance: bool = False
+) -> list[dict[str, Any]]:
+    """`rows` as `query_raw` returns them: vectors as pgvector text."""
+    return [
+        {
+            **row,
+            "vec": codec.encode_text(row["vec"]),
+            **({"distance": 0.1 * i} if distance else {}),
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+def raw_payload(rows: Sequence[dict[str, Any]]) -> str:
+    """Serialize `rows` into the query engine's raw query result JSON."""
+    columns = list(rows[0]) if rows else []
+    types = [_RAW_TYPES.get(type(rows[0][col]), "unknown") for col in columns]
+    return json.dumps(
+        {
+            "columns": columns,
+            "types": types,
+            "rows": [[row[col] for col in columns] for row in rows],
+        }
+    )
+
+
+class FakeClient:
+    """Stands in for `Prisma` with an in-process `query_raw` / `execute_raw`.
+
+    Parameters are JSON encoded and the canned response is decoded and
+    deserialized with Prisma's own code on every call, as the client does for
+    a real round trip.
+    """
+
+    _vector_transaction = None
+
+    def __init__(self) -> None:
+        self._payload = raw_payload([])
+
+    def respond_with(self, rows: Sequence[dict[str, Any]]) -> None:
+        self._payload = raw_payload(rows)
+
+    async def query_raw(self, query: str, *values: Any) -> list[dict[str, Any]]:
+        json.dumps({"query": query, "parameters": values}, default=str)
+        return deserialize_raw_results(json.loads(self._payload))
+
+    async def execute_raw(self, query: str, *values: Any) -> int:
+        json.dumps({"query": query, "parameters": values}, default=str)
+        return 0
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self) -> None:
+        self.engine: VectorEngine = PrismaEngine()
+        self.client: Any = FakeClient()
+
+    async def connect(self) -> None:
+        pass
+
+    async def setup(
+        self, table_name: str, dim: int, rows: list[dict[str, Any]]
+    ) -> None:
+        pass
+
+    def respond_with(
+        self, rows: Sequence[dict[str, Any]], distance: bool = False
+    ) -> None:
+        """Set the rows every statement returns until the next call."""
+        self.client.respond_with(as_text_rows(rows, distance))
+
+    async def close(self, keep_tables: bool = False) -> None:
+        pass
+
+
+class PostgresBackend:
+    """Runs the scenarios on PostgreSQL with pgvector, one table per dimension."""
+
+    name = "postgres"
+
+    def __init__(self, dsn: str) -> None:
+        self._dsn = dsn
+        self.engine: NativeEngine = NativeEngine(dsn)
+        self.client: Any = None
+        self._tables: list[str] = []
+
+    async def connect(self) -> None:
+        import asyncpg
+
+        # the engine only registers its vector codec if the type exists
+        conn = await asyncpg.connect(self._dsn)
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        finally:
+            await conn.close()
+        await self.engine.connect(self.client)
+
+    async def setup(
+        self, table_name: str, dim: int, rows: list[dict[str, Any]]
+    ) -> None:
+        """(Re)create `table_name` holding `rows`."""
+        table = quote_ident(table_name)
+        async with self.engine.pool.acquire() as conn:
+            await conn.execute(f"DROP TABLE IF EXISTS {table}")
+            await conn.execute(
+                f"CREATE TABLE {table} (id text PRIMARY KEY, "
+                f"body text NOT NULL, vec vector({dim}) NOT NULL)"
+            )
+            await conn.copy_records_to_table(
+                table_name,
+                records=[(row["id"], row["body"], row["vec"]) for row in rows],
+                columns=["id", "body", "vec"],
+            )
+            await conn.execute(f"ANALYZE {table}")
+        self._tables.append(table_name)
+
+    def respond_with(
+        self, rows: Sequence[dict[str, Any]], distance: bool = False
+    ) -> None:
+        pass
+
+    async def close(self, keep_tables: bool = False) -> None:
+        if not keep_tables:
+            async with self.engine.pool.acquire() as conn:
+                for table_name in self._tables:
+                    await conn.execute(
+                        f"DROP TABLE IF EXISTS {quote_ident(table_name)}"
+                    )
+        await self.engine.disconnect()
+
+
+def make_backend(database_url: Optional[str]) -> "FakeBackend | PostgresBackend":
+    return PostgresBackend(database_url) if database_url else FakeBackend()
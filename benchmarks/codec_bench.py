@@ -0,0 +1,58 @@
+"""Compare pgvector decoding paths on a synthetic result set.
+
+Usage:
+    python benchmarks/codec_bench.py [--rows 1000] [--dim 1536] [--repeat 5]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from vector_prisma import codec
+
+
+def make_rows(rows: int, dim: int) -> tuple[list[str], list[bytes]]:
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    texts = ["[" + ",".join(map(repr, row.tolist())) + "]" for row in matrix]
+    binaries = [codec.encode_binary(row) for row in matrix]
+    return texts, binaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts, binaries = make_rows(args.rows, args.dim)
+    cases = {
+        "eval (previous actions path)": lambda: [eval(text) for text in texts],
+        "split + float (previous vec_str2vec)": lambda: [
+            list(map(float, text[1:-1].split(","))) for text in texts
+        ],
+        "codec.decode_text per row": lambda: [
+            codec.decode_text(text) for text in texts
+        ],
+        "codec.decode_text_batch": lambda: codec.decode_text_batch(texts),
+        "codec.decode_text_rows (to lists)": lambda: codec.decode_text_rows(texts),
+        "codec.decode_binary_batch": lambda: codec.decode_binary_batch(binaries),
+    }
+
+    print(f"{args.rows} rows x {args.dim} dims, best of {args.repeat}")
+    baseline = None
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<42} {best * 1000:9.2f} ms  {baseline / best:7.1f}x")
+
+    # sanity check: the fast paths agree with the reference decoder
+    reference = np.array([eval(text) for text in texts], dtype=np.float32)
+    assert np.array_equal(codec.decode_text_batch(texts), reference)
+    assert np.array_equal(codec.decode_binary_batch(binaries), reference)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Benchmark scenarios, each mirroring what a generated action does per call.
+
+A scenario's `prepare` seeds the backend and returns the call to time. The
+calls go through the same builders, engine, codec and `model_parse` as the
+generated actions for a table ``(id text, body text, vec vector(dim))``.
+"""
+
+import itertools
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from prisma._compat import model_parse
+from pydantic import BaseModel
+
+from vector_prisma import codec, queries
+from vector_prisma.operations import SearchMetric, get_pgvector_operation
+from vector_prisma.queries import QueryBuilder
+from vector_prisma.results import record_type, to_records
+
+from .backends import FakeBackend, PostgresBackend, make_rows, make_vectors
+
+Backend = FakeBackend | PostgresBackend
+Call = Callable[[], Awaitable[Any]]
+
+COLUMNS = ("id", "body", "vec")
+VECTOR_COLUMNS = frozenset({"vec"})
+TOP_K = 10
+
+
+class Item(BaseModel):
+    id: str
+    body: str
+    vec: list[float]
+
+
+class ItemNNResult(BaseModel):
+    id: str
+    body: str
+    vec: Optional[list[float]]
+    distance: float
+
+
+class ItemTV(BaseModel):
+    id: str
+    body: str
+    vec: str
+
+
+class ItemNNResultTV(BaseModel):
+    id: str
+    body: str
+    vec: Optional[str]
+    distance: float
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    dim: int
+    rows: int
+    repeat: int
+    prepare: Callable[[Backend, "Scenario"], Awaitable[Call]]
+    # calls per timed sample, for calls too short to time one by one
+    number: int = 1
+    # rows each call returns, to report rows/sec
+    result_rows: int = 0
+
+    @property
+    def table_name(self) -> str:
+        return f"vector_prisma_bench_{self.dim}_{self.rows}"
+
+
+def _parse_rows(resp: list[dict[str, Any]], model: type[BaseModel]) -> list[Any]:
+    decoded = codec.decode_rows([item["vec"] for item in resp])
+    for item, vec in zip(resp, decoded):
+        item["vec"] = vec
+    return [model_parse(model, item) for item in resp]
+
+
+async def _insert_one(backend: Backend, scenario: Scenario) -> Call:
+    await backend.setup(scenario.table_name, scenario.dim, [])
+    vec = make_vectors(1, scenario.dim)[0]
+    backend.respond_with([{"id": "new", "body": "body", "vec": vec}])
+    ids = itertools.count()
+
+    async def call() -> Item:
+        data = {"id": f"new-{next(ids)}", "body": "body", "vec": vec}
+        query, values = QueryBuilder.build_insert_query(
+            scenario.table_name,
+            data,
+            vector_columns=VECTOR_COLUMNS,
+            text_vectors=backend.engine.text_vectors,
+        )
+        resp = await backend.engine.query(backend.client, query, values)
+        return _parse_rows(resp, Item)[0]
+
+    return call
+
+
+async def _upsert_many(backend: Backend, scenario: Scenario) -> Call:
+    rows = make_rows(scenario.rows, scenario.dim)
+    await backend.setup(scenario.table_name, scenario.dim, rows)
+    chunk_size = min(
+        queries.DEFAULT_CHUNK_SIZE, queries.MAX_QUERY_PARAMETERS // len(COLUMNS)
+    )
+
+    async def call() -> int:
+        count = 0
+        for start in range(0, len(rows), chunk_size):
+            query, values = QueryBuilder.build_insert_many_query(
+                scenario.table_name,
+                rows[start : start + chunk_size],
+                vector_columns=VECTOR_COLUMNS,
+                conflict_target=["id"],
+                text_vectors=backend.engine.text_vectors,
+            )
+            count += await backend.engine.execute(backend.client, query, values)
+        return count
+
+    return call
+
+
+async def _find_many(backend: Backend, scenario: Scenario) -> Call:
+    rows = make_rows(scenario.rows, scenario.dim)
+    await backend.setup(scenario.table_name, scenario.dim, rows)
+    backend.respond_with(rows)
+
+    async def call() -> list[Item]:
+        query, values = QueryBuilder.build_find_query(
+            scenario.table_name,
+            COLUMNS,
+            vector_columns=VECTOR_COLUMNS,
+            text_vectors=backend.engine.text_vectors,
+        )
+        resp = await backend.engine.query(backend.client, query, values)
+        return _parse_rows(resp, Item)
+
+    return call
+
+
+def _double_parse(
+    resp: list[dict[str, Any]], tv_model: type[BaseModel], model: type[BaseModel]
+) -> list[Any]:
+    # what the actions did before the codec and records: query_raw(model=TV),
+    # then model_dump, eval of every vector text and model_parse again
+    resp_dict_list = [model_parse(tv_model, item).model_dump() for item in resp]
+    for item in resp_dict_list:
+        if item["vec"] is not None:
+            item["vec"] = eval(item["vec"])
+    return [model_parse(model, item) for item in resp_dict_list]
+
+
+def _to_records(resp: list[dict[str, Any]], fields: tuple[str, ...]) -> list[Any]:
+    return to_records(resp, record_type("ItemRecord", fields), VECTOR_COLUMNS)
+
+
+async def _retrieve(backend: Backend, scenario: Scenario) -> Call:
+    return await _retrieve_rows(backend, scenario, "models")
+
+
+async def _retrieve_records(backend: Backend, scenario: Scenario) -> Call:
+    return await _retrieve_rows(backend, scenario, "records")
+
+
+async def _retrieve_double_parse(backend: Backend, scenario: Scenario) -> Call:
+    return await _retrieve_rows(backend, scenario, "double_parse")
+
+
+async def _retrieve_rows(backend: Backend, scenario: Scenario, mode: str) -> Call:
+    rows = make_rows(scenario.rows, scenario.dim)
+    await backend.setup(scenario.table_name, scenario.dim, rows)
+    top_k = scenario.result_rows or TOP_K
+    backend.respond_with(rows[:top_k], distance=True)
+    query_vec = make_vectors(1, scenario.dim, seed=1)[0]
+    text_vectors = mode == "double_parse" or backend.engine.text_vectors
+
+    async def call() -> list[Any]:
+        query, values = QueryBuilder.build_nn_query(
+            scenario.table_name,
+            COLUMNS,
+            query_vec,
+            "vec",
+            top_k,
+            SearchMetric.COSINE_DISTANCE,
+            text_vectors=text_vectors,
+        )
+        resp = await backend.engine.query(backend.client, query, values)
+        if mode == "records":
+            return _to_records(resp, (*COLUMNS, "distance"))
+        if mode == "double_parse":
+            return _double_parse(resp, ItemNNResultTV, ItemNNResult)
+        return _parse_rows(resp, ItemNNResult)
+
+    return call
+
+
+async def _find_many_double_parse(backend: Backend, scenario: Scenario) -> Call:
+    rows = make_rows(scenario.rows, scenario.dim)
+    await backend.setup(scenario.table_name, scenario.dim, rows)
+    backend.respond_with(rows)
+
+    async def call() -> list[Any]:
+        query, values = QueryBuilder.build_find_query(
+            scenario.table_name,
+            COLUMNS,
+            vector_columns=VECTOR_COLUMNS,
+            text_vectors=True,
+        )
+        resp = await backend.engine.query(backend.client, query, values)
+        return _double_parse(resp, ItemTV, Item)
+
+    return call
+
+
+async def _find_many_records(backend: Backend, scenario: Scenario) -> Call:
+    rows = make_rows(scenario.rows, scenario.dim)
+    await backend.setup(scenario.table_name, scenario.dim, rows)
+    backend.respond_with(rows)
+
+    async def call() -> list[Any]:
+        query, values = QueryBuilder.build_find_query(
+            scenario.table_name,
+            COLUMNS,
+            vector_columns=VECTOR_COLUMNS,
+            text_vectors=backend.engine.text_vectors,
+        )
+        resp = await backend.engine.query(backend.client, query, values)
+        return _to_records(resp, COLUMNS)
+
+    return call
+
+
+# Micro benchmarks of single steps of the hot path; they do not touch the backend.
+
+
+async def _build_nn_query(backend: Backend, scenario: Scenario) -> Call:
+    query_vec = make_vectors(1, scenario.dim)[0]
+
+    async def call() -> Any:
+        return QueryBuilder.build_nn_query(
+            scenario.table_name,
+            COLUMNS,
+            query_vec,
+            "vec",
+            TOP_K,
+            SearchMetric.COSINE_DISTANCE,
+            where={"body": "body 1"},
+        )
+
+    return call
+
+
+async def _get_pgvector_operation(backend: Backend, scenario: Scenario) -> Call:
+    query_vec = make_vectors(1, scenario.dim)[0].tolist()
+
+    async def call() -> str:
+        return get_pgvector_operation("vec", query_vec, SearchMetric.COSINE_DISTANCE)
+
+    return call
+
+
+async def _decode_text(backend: Backend, scenario: Scenario) -> Call:
+    text = codec.encode_text(make_vectors(1, scenario.dim)[0])
+
+    async def call() -> codec.FloatArray:
+        return codec.decode_text(text)
+
+    return call
+
+
+async def _model_parse(backend: Backend, scenario: Scenario) -> Call:
+    row = {
+        "id": "item-0",
+        "body": "body 0",
+        "vec": make_vectors(1, scenario.dim)[0].tolist(),
+        "distance": 0.5,
+    }
+
+    async def call() -> ItemNNResult:
+        return model_parse(ItemNNResult, row)
+
+    return call
+
+
+MICRO_SCENARIOS = (
+    Scenario("build_nn_query", 1536, 0, 20, _build_nn_query, number=1000),
+    Scenario("get_pgvector_operation", 1536, 0, 20, _get_pgvector_operation, 100),
+    Scenario("decode_text", 1536, 0, 20, _decode_text, number=100),
+    Scenario("model_parse", 1536, 0, 20, _model_parse, number=100),
+)
+
+SCENARIOS = (
+    Scenario("insert_one", 1536, 1, 200, _insert_one),
+    Scenario("upsert_many_10k", 768, 10_000, 5, _upsert_many),
+    Scenario(
+        "find_many_double_parse_100k",
+        128,
+        100_000,
+        3,
+        _find_many_double_parse,
+        result_rows=100_000,
+    ),
+    Scenario("find_many_100k", 128, 100_000, 3, _find_many, result_rows=100_000),
+    Scenario(
+        "find_many_records_100k",
+        128,
+        100_000,
+        3,
+        _find_many_records,
+        result_rows=100_000,
+    ),
+    Scenario("retrieve_128", 128, 10_000, 200, _retrieve),
+    Scenario("retrieve_768", 768, 10_000, 200, _retrieve),
+    Scenario("retrieve_1536", 1536, 10_000, 200, _retrieve),
+    # trusted-data mode against the model path and the double-parse baseline,
+    # for rows/sec at a larger top_k
+    Scenario(
+        "retrieve_double_parse_768",
+        768,
+        10_000,
+        50,
+        _retrieve_double_parse,
+        result_rows=100,
+    ),
+    Scenario("retrieve_models_768", 768, 10_000, 50, _retrieve, result_rows=100),
+    Scenario(
+        "retrieve_records_768", 768, 10_000, 50, _retrieve_records, result_rows=100
+    ),
+)
@@ -30,7 +30,11 @@ setup(
     install_requires=[
         "prisma>=0.15.0",
         "psycopg2>=2.9.1",
+        "numpy>=1.22",
     ],
+    extras_require={
+        "native": ["asyncpg>=0.29"],
+    },
     long_description=readme,
     long_description_content_type="text/markdown",
     packages=find_packages(
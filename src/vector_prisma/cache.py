@@ -0,0 +1,174 @@
+"""Opt-in client-side cache for nearest neighbor search results.
+
+Entries are keyed by a hash of the search statement, its parameters and a
+float16-quantized copy of the query vector, so identical searches (e.g. for
+popular search terms) skip the ANN search entirely. The cache is bounded in
+bytes with LRU eviction and a TTL, and every table's entries are dropped
+when a write to it goes through the same client.
+
+Enable it with ``VectorPrisma(nn_cache=NNCache(...))``.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Iterable, Optional, Union
+
+import numpy as np
+
+from . import codec
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+DEFAULT_TTL = 60.0
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    entries: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    table_name: str
+    rows: list[dict[str, Any]]
+    size: int
+    expires_at: float
+
+
+def quantize(vec: codec.VectorLike) -> bytes:
+    """Hashable form of a query vector; near-identical floats share a key."""
+    return codec.as_vector(vec).astype(np.float16).tobytes()
+
+
+def _estimate_size(rows: list[dict[str, Any]]) -> int:
+    size = 64
+    for row in rows:
+        size += 64 + 16 * len(row)
+        for value in row.values():
+            if isinstance(value, np.ndarray):
+                size += value.nbytes
+            elif isinstance(value, (str, bytes)):
+                size += len(value)
+            elif isinstance(value, list):
+                size += 8 * len(value)
+            else:
+                size += 16
+    return size
+
+
+class NNCache:
+    """LRU cache of search result rows, bounded by `max_bytes` and `ttl`."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: Union[float, timedelta] = DEFAULT_TTL,
+    ) -> None:
+        if isinstance(ttl, timedelta):
+            ttl = ttl.total_seconds()
+        if max_bytes < 1 or ttl <= 0:
+            raise ValueError("max_bytes and ttl must be positive")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, _Entry] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(table_name: str, query: str, params: Iterable[Any]) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(table_name.encode())
+        digest.update(b"\0")
+        digest.update(query.encode())
+        for param in params:
+            digest.update(b"\0")
+            digest.update(param if isinstance(param, bytes) else repr(param).encode())
+        return digest.digest()
+
+    def generation(self, table_name: str) -> int:
+        """Token to pass to `put`, taken before running the search."""
+        return self._generations.get(table_name, 0)
+
+    def get(self, key: bytes) -> Optional[list[dict[str, Any]]]:
+        """Return copies of the cached rows, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return [dict(row) for row in entry.rows]
+
+    def put(
+        self,
+        key: bytes,
+        table_name: str,
+        rows: list[dict[str, Any]],
+        generation: int,
+    ) -> None:
+        """Store `rows` unless the table was written to since `generation`."""
+        if generation != self.generation(table_name):
+            return
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(
+            table_name,
+            [dict(row) for row in rows],
+            size,
+            time.monotonic() + self.ttl,
+        )
+        self._size += size
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def invalidate(self, table_name: str) -> None:
+        """Drop every entry of `table_name`, e.g. after a write to it."""
+        self._generations[table_name] = self.generation(table_name) + 1
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if entry.table_name == table_name
+        ]
+        for key in stale:
+            self._remove(key)
+        self._invalidations += 1
+
+    def clear(self) -> None:
+        for table_name in {entry.table_name for entry in self._entries.values()}:
+            self.invalidate(table_name)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            invalidations=self._invalidations,
+            entries=len(self._entries),
+            size_bytes=self._size,
+        )
+
+    def _remove(self, key: bytes) -> None:
+        self._size -= self._entries.pop(key).size
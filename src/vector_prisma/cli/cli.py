@@ -8,6 +8,7 @@ from prisma import _sync_http as http
 from prisma.utils import DEBUG
 
 from ..generator.generator import Generator
+from . import index
 
 __all__ = ("main", "setup_logging")
 
@@ -25,6 +26,7 @@ def main(
     if args is None:
         args = sys.argv
 
+    code = 0
     with setup_logging(use_handler), cleanup(do_cleanup):
         if args[1] == "generate":
             generator = Generator()
@@ -32,7 +34,9 @@ def main(
         if args[1] == "reset":
             generator = Generator()
             generator.reset()
-    raise SystemExit(0)
+        if args[1] == "index":
+            code = index.main(args[2:])
+    raise SystemExit(code)
 
 
 @contextlib.contextmanager
@@ -0,0 +1,180 @@
+"""`vector-prisma index build|status` subcommands.
+
+Index builds can run for a long time, so they are run over psycopg2 on an
+autocommit connection (``CREATE INDEX CONCURRENTLY`` cannot run in a
+transaction) while a second connection polls ``pg_stat_progress_create_index``.
+"""
+
+import argparse
+import logging
+import os
+import threading
+from typing import Any, List, Optional
+
+from psycopg2 import connect
+from psycopg2.extras import RealDictCursor
+
+from .. import indexes
+from ..connection import libpq_dsn
+from ..indexes import IndexBuildProgress, IndexMethod, VectorIndex
+from ..operations import Quantization, SearchMetric
+
+__all__ = ("main",)
+
+log: logging.Logger = logging.getLogger(__name__)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="vector-prisma index")
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("DATABASE_URL"),
+        help="defaults to the DATABASE_URL environment variable",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="create a vector index")
+    build.add_argument("table")
+    build.add_argument("column")
+    build.add_argument(
+        "--method", choices=[m.value for m in IndexMethod], default="hnsw"
+    )
+    build.add_argument(
+        "--metric",
+        choices=[m.value for m in SearchMetric],
+        default=SearchMetric.COSINE_DISTANCE.value,
+    )
+    build.add_argument(
+        "--type",
+        dest="vector_type",
+        choices=["vector", "halfvec"],
+        default="vector",
+        help="type of the column",
+    )
+    build.add_argument(
+        "--quantization",
+        choices=[q.value for q in Quantization],
+        help="index a quantized expression of the column for rerank searches",
+    )
+    build.add_argument("--dim", type=int, help="column dimension, for --quantization")
+    build.add_argument("--m", type=int)
+    build.add_argument("--ef-construction", type=int)
+    build.add_argument("--lists", type=int)
+    build.add_argument("--name")
+    build.add_argument(
+        "--no-concurrently",
+        dest="concurrently",
+        action="store_false",
+        help="build with a lock blocking writes, which is faster",
+    )
+    build.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="seconds between progress reports",
+    )
+
+    status = commands.add_parser("status", help="show vector indexes and builds")
+    status.add_argument("table")
+    return parser
+
+
+def _fetch(dsn: str, query: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+    conn = connect(dsn)
+    try:
+        with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _progress(dsn: str, table: str) -> list[IndexBuildProgress]:
+    rows = _fetch(dsn, indexes.index_progress_sql("%s"), (table,))
+    return [IndexBuildProgress.from_row(row) for row in rows]
+
+
+def _create_index_sql(args: argparse.Namespace) -> str:
+    return indexes.create_index_sql(
+        args.table,
+        args.column,
+        IndexMethod(args.method),
+        SearchMetric(args.metric),
+        m=args.m,
+        ef_construction=args.ef_construction,
+        lists=args.lists,
+        concurrently=args.concurrently,
+        name=args.name,
+        vector_type=args.vector_type,
+        quantization=Quantization(args.quantization) if args.quantization else None,
+        dim=args.dim,
+    )
+
+
+def _build(args: argparse.Namespace, dsn: str, query: str) -> int:
+    errors: List[Exception] = []
+
+    def run() -> None:
+        conn = connect(dsn)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(query)
+        except Exception as err:
+            errors.append(err)
+        finally:
+            conn.close()
+
+    log.info("%s", query)
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    while True:
+        worker.join(args.interval)
+        if not worker.is_alive():
+            break
+        for progress in _progress(dsn, args.table):
+            log.info("%s", progress)
+
+    if errors:
+        log.error("Index build failed: %s", errors[0])
+        return 1
+    log.info("Index build finished")
+    return 0
+
+
+def _status(args: argparse.Namespace, dsn: str) -> int:
+    rows = _fetch(dsn, indexes.list_indexes_sql("%s"), (args.table,))
+    found = [VectorIndex.from_row(row) for row in rows]
+    if not found:
+        log.info("No vector indexes on %s", args.table)
+    for index in found:
+        log.info(
+            "%s: %s on %s (%s), %.1f MiB%s",
+            index.name,
+            index.method.value,
+            index.column,
+            index.metric.value if index.metric else index.opclass,
+            index.size_bytes / 2**20,
+            "" if index.valid else ", INVALID",
+        )
+    for progress in _progress(dsn, args.table):
+        log.info("building %s", progress)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    query = None
+    if args.command == "build":
+        try:
+            query = _create_index_sql(args)
+        except ValueError as err:
+            parser.error(str(err))
+    if not args.database_url:
+        log.error("Pass --database-url or set DATABASE_URL")
+        return 2
+    dsn = libpq_dsn(args.database_url)
+    if query is not None:
+        return _build(args, dsn, query)
+    return _status(args, dsn)
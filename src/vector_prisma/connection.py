@@ -0,0 +1,43 @@
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+if TYPE_CHECKING:
+    from prisma import Prisma
+
+# Connection string parameters understood by the Prisma query engine but
+# rejected by libpq based drivers.
+PRISMA_ONLY_PARAMETERS = frozenset(
+    {
+        "schema",
+        "connection_limit",
+        "pool_timeout",
+        "socket_timeout",
+        "pgbouncer",
+        "statement_cache_size",
+        "sslidentity",
+        "sslpassword",
+        "sslaccept",
+    }
+)
+
+
+def libpq_dsn(url: str) -> str:
+    """Convert a Prisma datasource url into a DSN usable by native drivers.
+
+    Prisma-only query parameters are dropped, and `schema` is translated into
+    a `search_path` startup option so that unqualified table names resolve the
+    same way they do through the query engine.
+    """
+    parts = urlsplit(url)
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(key, value) for key, value in params if key not in PRISMA_ONLY_PARAMETERS]
+    schema = dict(params).get("schema")
+    if schema:
+        kept.append(("options", f"-csearch_path={schema}"))
+    return urlunsplit(parts._replace(query=urlencode(kept)))
+
+
+def datasource_url(client: "Prisma") -> str:
+    """Return the url the client's query engine connects with."""
+    datasource = client._datasource or client._default_datasource
+    return datasource["url"]
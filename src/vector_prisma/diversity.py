@@ -0,0 +1,56 @@
+"""Maximal marginal relevance selection over fetched search candidates.
+
+MMR picks results one at a time, each maximizing
+``lambda_mult * relevance - (1 - lambda_mult) * redundancy``, where relevance
+is the negated distance to the query and redundancy the negated distance to
+the closest result already picked. Distances follow pgvector's operators for
+each `SearchMetric`, so the inner product is negated as with ``<#>``.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+from . import codec
+from .operations import SearchMetric
+from .snapshot import pairwise_distances
+
+DEFAULT_FETCH_FACTOR = 4
+
+
+def mmr_select(
+    query_distances: codec.FloatArray,
+    vectors: codec.FloatArray,
+    k: int,
+    lambda_mult: float,
+    metric: SearchMetric,
+) -> npt.NDArray[np.int64]:
+    """Positions of the `k` candidates MMR picks, in the order they were picked.
+
+    `query_distances` are the candidates' distances to the query, as returned
+    by the search, and `vectors` their ``(n, dim)`` float32 vectors.
+    """
+    count = min(k, len(vectors))
+    picked = np.empty(count, dtype=np.int64)
+    if count == 0:
+        return picked
+    relevance = -lambda_mult * np.asarray(query_distances, dtype=np.float64)
+    # a zero vector has no cosine distance; count it as orthogonal to the
+    # others rather than infinitely far, which would favour picking it
+    pairwise = pairwise_distances(
+        vectors, np.linalg.norm(vectors, axis=1), vectors, metric, zero_distance=1.0
+    ).astype(np.float64)
+    # distance of every candidate to its closest picked one
+    closest = np.full(len(vectors), np.inf)
+    available = np.ones(len(vectors), dtype=bool)
+    for i in range(count):
+        if i == 0:
+            scores = relevance.copy()
+        else:
+            scores = relevance + (1 - lambda_mult) * closest
+        scores[~available] = -np.inf
+        scores[np.isnan(scores)] = -np.inf
+        best = int(np.argmax(scores))
+        picked[i] = best
+        available[best] = False
+        np.minimum(closest, pairwise[:, best], out=closest)
+    return picked
@@ -0,0 +1,332 @@
+"""Engines executing the statements built by the generated vector actions.
+
+`PrismaEngine` (the default) sends statements through the Prisma query engine
+with `query_raw` / `execute_raw`. `NativeEngine` runs them on a pooled asyncpg
+connection instead, skipping the query engine's HTTP/JSON layer, with
+prepared statements and binary transfer of vector columns.
+
+Select one with `VectorPrisma(vector_engine=NativeEngine(...))`.
+"""
+
+import contextlib
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+from . import codec, execution
+from .connection import datasource_url, libpq_dsn
+
+if TYPE_CHECKING:
+    import asyncpg
+    from prisma import Prisma
+
+
+class VectorTransaction(Protocol):
+    async def commit(self) -> None: ...
+
+    async def rollback(self) -> None: ...
+
+
+class VectorEngine(Protocol):
+    text_vectors: bool
+    """Whether vector columns must be selected as `::text` for this engine."""
+
+    async def connect(self, client: "Prisma") -> None: ...
+
+    async def disconnect(self) -> None: ...
+
+    async def begin(self) -> Optional[VectorTransaction]:
+        """Start a transaction for `tx_vec()`, if the engine manages its own."""
+        ...
+
+    async def query(
+        self,
+        client: "Prisma",
+        query: str,
+        values: Sequence[Any],
+        settings: Mapping[str, str] = {},
+    ) -> list[dict[str, Any]]: ...
+
+    async def execute(
+        self, client: "Prisma", query: str, values: Sequence[Any]
+    ) -> int: ...
+
+    async def batch(
+        self, client: "Prisma", statements: Sequence[tuple[str, str, list[Any]]]
+    ) -> list[Any]:
+        """Run `(method, query, values)` statements in order, see `run_batch`."""
+        ...
+
+
+class PrismaEngine:
+    """Run vector statements through the Prisma query engine."""
+
+    text_vectors = True
+
+    async def connect(self, client: "Prisma") -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def begin(self) -> Optional[VectorTransaction]:
+        # statements already join the Prisma transaction through its tx id
+        return None
+
+    async def query(
+        self,
+        client: "Prisma",
+        query: str,
+        values: Sequence[Any],
+        settings: Mapping[str, str] = {},
+    ) -> list[dict[str, Any]]:
+        return await execution.query_with_settings(
+            client, query, list(values), settings
+        )
+
+    async def execute(self, client: "Prisma", query: str, values: Sequence[Any]) -> int:
+        return await client.execute_raw(query, *values)
+
+    async def batch(
+        self, client: "Prisma", statements: Sequence[tuple[str, str, list[Any]]]
+    ) -> list[Any]:
+        return await execution.run_batch(client, statements)
+
+
+def _encode_vector(value: Any) -> bytes:
+    if isinstance(value, str):
+        value = codec.decode_text(value)
+    return codec.encode_binary(value)
+
+
+def _encode_halfvec(value: Any) -> bytes:
+    if isinstance(value, str):
+        value = codec.decode_text(value)
+    return codec.encode_halfvec_binary(value)
+
+
+def _affected_rows(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "INSERT 0 5" or "DELETE 3"
+    count = status.rsplit(" ", 1)[-1]
+    return int(count) if count.isdigit() else 0
+
+
+class NativeTransaction:
+    """A pooled connection held in a transaction for the duration of `tx_vec()`."""
+
+    def __init__(
+        self,
+        pool: "asyncpg.Pool",
+        connection: "asyncpg.Connection",
+        transaction: "asyncpg.transaction.Transaction",
+    ) -> None:
+        self.connection = connection
+        self._pool = pool
+        self._transaction = transaction
+
+    async def commit(self) -> None:
+        try:
+            await self._transaction.commit()
+        finally:
+            await self._pool.release(self.connection)
+
+    async def rollback(self) -> None:
+        try:
+            await self._transaction.rollback()
+        finally:
+            await self._pool.release(self.connection)
+
+
+class NativeEngine:
+    """Run vector statements on an asyncpg connection pool.
+
+    asyncpg prepares and caches every statement per connection (see
+    `statement_cache_size`, set it to 0 behind pgbouncer in transaction
+    mode). Vector columns are transferred in pgvector's binary format and
+    decoded straight into float32 arrays.
+
+    Inside `tx_vec()` the vector statements run in a transaction on one pooled
+    connection which commits or rolls back together with the Prisma
+    transaction. Non-vector Prisma queries in the same block still run in the
+    query engine's own transaction.
+    """
+
+    text_vectors = False
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        command_timeout: Optional[float] = None,
+        statement_cache_size: int = 1024,
+        max_inactive_connection_lifetime: float = 300.0,
+    ) -> None:
+        self._dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._timeout = timeout
+        self._command_timeout = command_timeout
+        self._statement_cache_size = statement_cache_size
+        self._max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self._pool: Optional["asyncpg.Pool"] = None
+
+    @property
+    def pool(self) -> "asyncpg.Pool":
+        if self._pool is None:
+            raise RuntimeError(
+                "The native engine is not connected, call `await client.connect()`"
+            )
+        return self._pool
+
+    async def connect(self, client: "Prisma") -> None:
+        try:
+            import asyncpg
+        except ImportError as err:
+            raise RuntimeError(
+                "NativeEngine requires asyncpg, "
+                "install it with `pip install vector-prisma[native]`"
+            ) from err
+
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            self._dsn or libpq_dsn(datasource_url(client)),
+            min_size=self._min_size,
+            max_size=self._max_size,
+            timeout=self._timeout,
+            command_timeout=self._command_timeout,
+            statement_cache_size=self._statement_cache_size,
+            max_inactive_connection_lifetime=self._max_inactive_connection_lifetime,
+            init=self._init_connection,
+        )
+
+    async def disconnect(self) -> None:
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    @staticmethod
+    async def _init_connection(conn: "asyncpg.Connection") -> None:
+        schema = await conn.fetchval(
+            "SELECT n.nspname FROM pg_type t "
+            "JOIN pg_namespace n ON n.oid = t.typnamespace "
+            "WHERE t.typname = 'vector'"
+        )
+        if schema is not None:
+            await conn.set_type_codec(
+                "vector",
+                schema=schema,
+                encoder=_encode_vector,
+                decoder=codec.decode_binary,
+                format="binary",
+            )
+            # halfvec ships with pgvector 0.7.0
+            has_halfvec = await conn.fetchval(
+                "SELECT to_regtype($1) IS NOT NULL", f"{schema}.halfvec"
+            )
+            if has_halfvec:
+                await conn.set_type_codec(
+                    "halfvec",
+                    schema=schema,
+                    encoder=_encode_halfvec,
+                    decoder=codec.decode_halfvec_binary,
+                    format="binary",
+                )
+        # Prisma models expect uuids and bit strings as strings
+        for type_name in ("uuid", "bit", "varbit"):
+            await conn.set_type_codec(
+                type_name, schema="pg_catalog", encoder=str, decoder=str, format="text"
+            )
+
+    async def begin(self) -> NativeTransaction:
+        connection = await self.pool.acquire(timeout=self._timeout)
+        try:
+            transaction = connection.transaction()
+            await transaction.start()
+        except BaseException:
+            await self.pool.release(connection)
+            raise
+        return NativeTransaction(self.pool, connection, transaction)
+
+    @contextlib.asynccontextmanager
+    async def _connection(
+        self, client: "Prisma"
+    ) -> AsyncIterator[tuple["asyncpg.Connection", bool]]:
+        transaction = getattr(client, "_vector_transaction", None)
+        if isinstance(transaction, NativeTransaction):
+            yield transaction.connection, True
+            return
+        async with self.pool.acquire(timeout=self._timeout) as connection:
+            yield connection, False
+
+    async def query(
+        self,
+        client: "Prisma",
+        query: str,
+        values: Sequence[Any],
+        settings: Mapping[str, str] = {},
+    ) -> list[dict[str, Any]]:
+        async with self._connection(client) as (conn, in_transaction):
+            if not settings:
+                rows = await conn.fetch(query, *values)
+            elif in_transaction:
+                # in a savepoint, so a failing statement rolls the settings
+                # back with it and leaves the transaction usable
+                async with conn.transaction():
+                    previous = [
+                        await conn.fetchval("SELECT current_setting($1, true)", name)
+                        for name in settings
+                    ]
+                    for name, value in settings.items():
+                        await conn.execute(
+                            "SELECT set_config($1, $2, true)", name, value
+                        )
+                    rows = await conn.fetch(query, *values)
+                    # a released savepoint keeps SET LOCAL, restore the caller's
+                    for name, value in zip(settings, previous):
+                        if value is None:
+                            await conn.execute(f"RESET {execution.setting_name(name)}")
+                        else:
+                            await conn.execute(
+                                "SELECT set_config($1, $2, true)", name, value
+                            )
+            else:
+                async with conn.transaction():
+                    for name, value in settings.items():
+                        await conn.execute(
+                            "SELECT set_config($1, $2, true)", name, value
+                        )
+                    rows = await conn.fetch(query, *values)
+        return [dict(row) for row in rows]
+
+    async def execute(self, client: "Prisma", query: str, values: Sequence[Any]) -> int:
+        async with self._connection(client) as (conn, _):
+            return _affected_rows(await conn.execute(query, *values))
+
+    async def batch(
+        self, client: "Prisma", statements: Sequence[tuple[str, str, list[Any]]]
+    ) -> list[Any]:
+        # asyncpg has no multi-statement pipeline for parameterized queries, so
+        # this only saves the per-call pool checkout inside `tx_vec()`
+        results: list[Any] = []
+        async with self._connection(client) as (conn, _):
+            for index, (method, query, values) in enumerate(statements):
+                try:
+                    if method == "query":
+                        rows = await conn.fetch(query, *values)
+                        results.append([dict(row) for row in rows])
+                    else:
+                        status = await conn.execute(query, *values)
+                        results.append(_affected_rows(status))
+                except Exception as err:
+                    raise execution.BatchError(index) from err
+        return results
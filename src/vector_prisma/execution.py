@@ -0,0 +1,161 @@
+"""Running raw statements with transaction-scoped settings.
+
+Planner and index settings such as ``hnsw.iterative_scan`` only affect the
+session they are set in. The Prisma query engine pools its connections, so
+they are applied with ``set_config(..., is_local => true)`` in the same
+transaction as the statement they are meant for. Everything is sent to the
+engine as one batch, which costs a single round trip.
+"""
+
+import re
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Sequence, cast
+
+from prisma._builder import QueryBuilder, dumps
+from prisma._raw_query import deserialize_raw_results
+from prisma.engine.utils import handle_response_errors
+from prisma.errors import DataError, PrismaError
+
+if TYPE_CHECKING:
+    from prisma import Prisma
+
+_SETTING_NAME = re.compile(r"^[a-z_]+(\.[a-z_]+)?$")
+
+
+class BatchError(Exception):
+    """A statement of a batch failed; the engine error is the `__cause__`."""
+
+    def __init__(self, index: int) -> None:
+        super().__init__(f"Statement {index} of the batch failed")
+        self.index = index
+
+
+def setting_name(name: str) -> str:
+    """Validate a configuration parameter name before it is put into SQL."""
+    if not _SETTING_NAME.match(name):
+        raise ValueError(f"Invalid setting name: {name!r}")
+    return name
+
+
+def _raw_query(client: "Prisma", method: str, query: str, values: list[Any]) -> str:
+    builder = QueryBuilder(
+        method=method,  # type: ignore[arg-type]
+        arguments={"query": query, "parameters": values},
+        prisma_models=client._prisma_models,
+        relational_field_mappings=client._relational_field_mappings,
+    )
+    return builder.build_query()
+
+
+def _engine_error(errors: list[Any]) -> Exception:
+    """The Prisma error the client raises for the engine `errors`."""
+    try:
+        # the response is only used when no error can be built from `errors`
+        handle_response_errors(cast(Any, None), errors)
+    except Exception as err:
+        return err
+
+
+async def _current_settings(client: "Prisma", names: list[str]) -> list[Optional[str]]:
+    columns = ", ".join(
+        f"current_setting(${i}, true) AS s{i}" for i in range(1, len(names) + 1)
+    )
+    row = (await client.query_raw(f"SELECT {columns}", *names))[0]
+    return [row[f"s{i}"] for i in range(1, len(names) + 1)]
+
+
+async def query_with_settings(
+    client: "Prisma",
+    query: str,
+    values: list[Any],
+    settings: Mapping[str, str],
+) -> list[dict[str, Any]]:
+    """Run `query` through `client.query_raw` with `settings` applied to it only.
+
+    Inside an interactive transaction (`tx()` / `tx_vec()`) the settings are
+    restored to the values in effect before, including any ``SET LOCAL`` of
+    the caller, once the statement has run; this costs a round trip to read
+    them first. A failing statement raises the error Prisma maps it to.
+    """
+    if not settings:
+        return await client.query_raw(query, *values)
+
+    names = [setting_name(name) for name in settings]
+    in_transaction = client.is_transaction()
+    statements = [
+        _raw_query(
+            client, "query_raw", "SELECT set_config($1, $2, true)", [name, str(value)]
+        )
+        for name, value in zip(names, settings.values())
+    ]
+    statements.append(_raw_query(client, "query_raw", query, values))
+    if in_transaction:
+        previous = await _current_settings(client, names)
+        statements.extend(
+            _raw_query(client, "execute_raw", f"RESET {name}", [])
+            if value is None
+            else _raw_query(
+                client, "query_raw", "SELECT set_config($1, $2, true)", [name, value]
+            )
+            for name, value in zip(names, previous)
+        )
+
+    payload = {
+        "batch": [{"query": statement, "variables": {}} for statement in statements],
+        "transaction": not in_transaction,
+    }
+    resp = await client._engine.query(dumps(payload), tx_id=client._tx_id)
+    for item in resp["batchResult"]:
+        if item.get("errors"):
+            raise _engine_error(item["errors"])
+    result = resp["batchResult"][len(names)]["data"]["result"]
+    return deserialize_raw_results(result)
+
+
+def _batch_index(error: PrismaError) -> Optional[int]:
+    data = getattr(error, "data", None)
+    if not isinstance(data, dict):
+        return None
+    index = data.get("user_facing_error", {}).get("batch_request_idx")
+    if index is None:
+        index = data.get("batch_request_idx")
+    return index if isinstance(index, int) else None
+
+
+async def run_batch(
+    client: "Prisma", statements: Sequence[tuple[str, str, list[Any]]]
+) -> list[Any]:
+    """Send `(method, query, values)` statements to the engine in one batch.
+
+    `method` is ``"query"`` or ``"execute"``; results come back in order, as
+    rows or affected row counts. A failing statement raises `BatchError` with
+    its position, chained to the engine error.
+    """
+    payload = {
+        "batch": [
+            {
+                "query": _raw_query(client, f"{method}_raw", query, values),
+                "variables": {},
+            }
+            for method, query, values in statements
+        ],
+        "transaction": not client.is_transaction(),
+    }
+    try:
+        resp = await client._engine.query(dumps(payload), tx_id=client._tx_id)
+    except PrismaError as err:
+        index = _batch_index(err)
+        if index is None:
+            raise
+        raise BatchError(index) from err
+
+    results: list[Any] = []
+    for index, ((method, _, _), item) in enumerate(
+        zip(statements, resp["batchResult"])
+    ):
+        if item.get("errors"):
+            raise BatchError(index) from DataError(item["errors"][0])
+        result = item["data"]["result"]
+        results.append(
+            deserialize_raw_results(result) if method == "query" else int(result)
+        )
+    return results
@@ -14,6 +14,11 @@ GENERATE_FILES = {
     "models.py.jinja": Path(__file__).parent.parent.joinpath("models.py"),
 }
 
+# pgvector column types: `vector` and `halfvec` hold float vectors, `bit` holds
+# binary-quantized ones.
+VECTOR_TYPE_PATTERN = re.compile(r"\b(vector|halfvec|bit)\((\d+)\)")
+FLOAT_VECTOR_TYPES = ("vector", "halfvec")
+
 DEFAULT_ENV = Environment(
     trim_blocks=True,
     lstrip_blocks=True,
@@ -22,6 +27,60 @@ DEFAULT_ENV = Environment(
 )
 
 
+# PostgreSQL types of Prisma scalars, and of the @db native type attributes
+# that change them. Used to cast raw query parameters, which are bound untyped.
+SCALAR_SQL_TYPES = {
+    "String": "text",
+    "Int": "integer",
+    "BigInt": "bigint",
+    "Float": "double precision",
+    "Decimal": "numeric",
+    "Boolean": "boolean",
+    "DateTime": "timestamp(3)",
+    "Json": "jsonb",
+    "Bytes": "bytea",
+}
+NATIVE_SQL_TYPES = {
+    "Uuid": "uuid",
+    "Text": "text",
+    "VarChar": "text",
+    "Char": "text",
+    "SmallInt": "smallint",
+    "Integer": "integer",
+    "BigInt": "bigint",
+    "Real": "real",
+    "DoublePrecision": "double precision",
+    "Decimal": "numeric",
+    "Date": "date",
+    "Time": "time",
+    "Timestamp": "timestamp",
+    "Timestamptz": "timestamptz",
+    "Json": "json",
+    "JsonB": "jsonb",
+}
+NATIVE_TYPE_PATTERN = re.compile(r"@db\.(\w+)")
+# Unsupported("...") types the actions need to know about
+UNSUPPORTED_SQL_TYPES = {"tsvector": "tsvector"}
+UNSUPPORTED_TYPE_PATTERN = re.compile(r'Unsupported\("(\w+)"\)')
+
+
+def sql_type(
+    field_type: str, attributes: str, enums: frozenset[str] = frozenset()
+) -> str | None:
+    """PostgreSQL type of a scalar or enum field, or None when it is not known."""
+    native = NATIVE_TYPE_PATTERN.search(attributes)
+    if native and native.group(1) in NATIVE_SQL_TYPES:
+        return NATIVE_SQL_TYPES[native.group(1)]
+    unsupported = UNSUPPORTED_TYPE_PATTERN.match(field_type)
+    if unsupported:
+        return UNSUPPORTED_SQL_TYPES.get(unsupported.group(1))
+    base_type = field_type.rstrip("?")
+    if base_type in enums:
+        # Prisma creates enums as types named after them, case preserved
+        return '"' + base_type.replace('"', '""') + '"'
+    return SCALAR_SQL_TYPES.get(base_type)
+
+
 def regex_search(value, pattern):
     match = re.search(pattern, value)
     return match.groups() if match else []
@@ -45,6 +104,10 @@ class Generator:
         tables = []
         table_pattern = re.compile(r"model (\w+) \{(.*?)\}", re.S)
         field_pattern = re.compile(r"(\w+)\s+([^\s]+)(.*)")
+        # a field is a relation when its type names another model; scalar,
+        # enum and Unsupported fields are columns
+        model_names = {match.group(1) for match in table_pattern.finditer(schema)}
+        enums = self.extract_enums(schema)
 
         for table_match in table_pattern.finditer(schema):
             table_name = table_match.group(1)
@@ -62,15 +125,7 @@ class Generator:
                     continue
                 seen_fields.add(field_name)
 
-                is_relation = (
-                    re.match(r"\w+", field_type)
-                    and not field_type.startswith("String")
-                    and not field_type.startswith("Int")
-                    and not field_type.startswith("Float")
-                    and not field_type.startswith("Boolean")
-                    and not field_type.startswith("DateTime")
-                    and not field_type.startswith("Unsupported")
-                )
+                is_relation = field_type.rstrip("?[]") in model_names
 
                 fields.append(
                     {
@@ -81,31 +136,74 @@ class Generator:
                     }
                 )
 
-                if "Unsupported" in field_type and "vector" in field_type:
+                if "Unsupported" in field_type and VECTOR_TYPE_PATTERN.search(
+                    field_type
+                ):
                     has_vector_field = True
 
             if has_vector_field:
-                tables.append({"table": table_name, "fields": fields})
+                tables.append({"table": table_name, "fields": fields, "enums": enums})
 
         return tables
 
+    @staticmethod
+    def extract_enums(schema: str) -> frozenset[str]:
+        return frozenset(re.findall(r"^\s*enum (\w+) \{", schema, re.M))
+
     def transform_to_dmmf_format(self, json_data):
         models = []
         for table in json_data:
             fields = []
             for field in table["fields"]:
+                vector_type = vector_dim = None
+                if "Unsupported" in field["type"]:
+                    match = VECTOR_TYPE_PATTERN.search(field["type"])
+                    if match:
+                        vector_type, vector_dim = match.group(1), int(match.group(2))
                 fields.append(
                     {
                         "name": field["name"],
                         "type": field["type"],
                         "is_relation": field["relation"],
                         "is_required": True,
+                        "is_id": "@id" in field["attributes"],
+                        "is_uuid": "@db.Uuid" in field["attributes"],
+                        "sql_type": sql_type(
+                            field["type"], field["attributes"], table["enums"]
+                        ),
+                        "vector_type": vector_type,
+                        "vector_dim": vector_dim,
                     }
                 )
+            columns = [field for field in fields if not field["is_relation"]]
             models.append(
                 {
                     "name": table["table"],
                     "all_fields": fields,
+                    "columns": [field["name"] for field in columns],
+                    "uuid_columns": [
+                        field["name"] for field in columns if field["is_uuid"]
+                    ],
+                    "column_types": {
+                        field["name"]: field["sql_type"]
+                        for field in columns
+                        if field["sql_type"] is not None
+                    },
+                    "vector_dims": {
+                        field["name"]: field["vector_dim"]
+                        for field in columns
+                        if field["vector_type"] in FLOAT_VECTOR_TYPES
+                    },
+                    "vector_types": {
+                        field["name"]: field["vector_type"]
+                        for field in columns
+                        if field["vector_type"] in FLOAT_VECTOR_TYPES
+                    },
+                    "bit_columns": [
+                        field["name"]
+                        for field in columns
+                        if field["vector_type"] == "bit"
+                    ],
                 }
             )
         return {"datamodel": {"models": models}}
@@ -0,0 +1,281 @@
+"""pgvector ANN index management: DDL, catalog lookups and build progress.
+
+An HNSW or IVFFlat index only serves searches whose distance operator
+matches the index's operator class, so every index is created for one
+`SearchMetric`. Indexes for rerank searches are built on a quantized
+expression of the column instead (see `queries.quantized_expression`). The
+statements here are plain text; they run through the vector engine from the
+generated actions and through psycopg2 from the CLI.
+"""
+
+import logging
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Optional, Sequence
+
+from .operations import Quantization, SearchMetric
+from .queries import quantized_expression, quote_ident
+
+log: logging.Logger = logging.getLogger(__name__)
+
+# PostgreSQL truncates identifiers longer than NAMEDATALEN - 1 bytes.
+MAX_IDENTIFIER_LENGTH = 63
+
+
+class IndexMethod(str, Enum):
+    HNSW = "hnsw"
+    IVFFLAT = "ivfflat"
+
+
+# Operator class suffixes; the prefix is the indexed type, e.g. vector_l2_ops.
+_OPCLASSES = {
+    SearchMetric.L1_DISTANCE: "l1",
+    SearchMetric.L2_DISTANCE: "l2",
+    SearchMetric.INNER_PRODUCT: "ip",
+    SearchMetric.COSINE_DISTANCE: "cosine",
+}
+BINARY_OPCLASS = "bit_hamming_ops"
+
+
+def get_opclass(
+    metric: SearchMetric,
+    method: IndexMethod,
+    vector_type: str = "vector",
+    quantization: Optional[Quantization] = None,
+) -> str:
+    """Return the pgvector operator class serving `metric` with `method`.
+
+    With `quantization`, the class indexing that quantized form of the column.
+    """
+    if quantization is not None and Quantization(quantization) == Quantization.BINARY:
+        return BINARY_OPCLASS
+    if metric == SearchMetric.L1_DISTANCE and method == IndexMethod.IVFFLAT:
+        raise ValueError("IVFFlat indexes do not support L1 distance")
+    if quantization is not None:
+        vector_type = "halfvec"
+    return f"{vector_type}_{_OPCLASSES[metric]}_ops"
+
+
+def metric_for_opclass(opclass: str) -> Optional[SearchMetric]:
+    for metric, suffix in _OPCLASSES.items():
+        if opclass in (f"vector_{suffix}_ops", f"halfvec_{suffix}_ops"):
+            return metric
+    return None
+
+
+def index_name(
+    table_name: str,
+    column: str,
+    method: IndexMethod,
+    metric: SearchMetric,
+    vector_type: str = "vector",
+    quantization: Optional[Quantization] = None,
+) -> str:
+    """Default index name, e.g. ``Item_vec_hnsw_cosine_idx``."""
+    opclass = get_opclass(metric, method, vector_type, quantization)
+    suffix = opclass.removeprefix("vector_").removesuffix("_ops")
+    return f"{table_name}_{column}_{method.value}_{suffix}_idx"[:MAX_IDENTIFIER_LENGTH]
+
+
+def _check_range(name: str, value: Optional[int], low: int, high: int) -> None:
+    if value is not None and not low <= value <= high:
+        raise ValueError(f"{name} must be between {low} and {high}, got {value}")
+
+
+def create_index_sql(
+    table_name: str,
+    column: str,
+    method: IndexMethod,
+    metric: SearchMetric,
+    *,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    lists: Optional[int] = None,
+    concurrently: bool = True,
+    name: Optional[str] = None,
+    vector_type: str = "vector",
+    quantization: Optional[Quantization] = None,
+    dim: Optional[int] = None,
+) -> str:
+    """Build a ``CREATE INDEX`` statement for a vector column.
+
+    `m` and `ef_construction` apply to HNSW and `lists` to IVFFlat; options
+    left as None use pgvector's defaults. With `quantization`, the index is
+    built on the quantized expression rerank searches order by, which needs
+    the column's `dim`.
+    """
+    key = quote_ident(column)
+    if quantization is not None:
+        if dim is None:
+            raise ValueError("dim is required for a quantized index")
+        key = f"({quantized_expression(key, quantization, dim)})"
+    if method == IndexMethod.HNSW:
+        if lists is not None:
+            raise ValueError("lists only applies to IVFFlat indexes")
+        _check_range("m", m, 2, 100)
+        _check_range("ef_construction", ef_construction, 4, 1000)
+        if ef_construction is not None and ef_construction < 2 * (m or 16):
+            raise ValueError("ef_construction must be at least twice m")
+        options = {"m": m, "ef_construction": ef_construction}
+    else:
+        if m is not None or ef_construction is not None:
+            raise ValueError("m and ef_construction only apply to HNSW indexes")
+        _check_range("lists", lists, 1, 32768)
+        options = {"lists": lists}
+
+    default_name = index_name(
+        table_name, column, method, metric, vector_type, quantization
+    )
+    query = (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"{quote_ident(name or default_name)} "
+        f"ON {quote_ident(table_name)} USING {method.value} "
+        f"({key} {get_opclass(metric, method, vector_type, quantization)})"
+    )
+    with_str = ", ".join(
+        f"{key} = {value}" for key, value in options.items() if value is not None
+    )
+    if with_str:
+        query += f" WITH ({with_str})"
+    return query
+
+
+def drop_index_sql(name: str, *, concurrently: bool = True) -> str:
+    return (
+        f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}"
+        f"IF EXISTS {quote_ident(name)}"
+    )
+
+
+def list_indexes_sql(placeholder: str = "$1") -> str:
+    """Catalog query for the vector indexes of the table bound to `placeholder`."""
+    return (
+        "SELECT i.relname AS name, t.relname AS table_name, "
+        "COALESCE(a.attname, pg_get_indexdef(i.oid, 1, true)) AS column_name, "
+        "am.amname AS method, "
+        "opc.opcname AS opclass, ix.indisvalid AS valid, "
+        "pg_relation_size(i.oid) AS size_bytes, "
+        "pg_get_indexdef(i.oid) AS definition "
+        "FROM pg_index ix "
+        "JOIN pg_class t ON t.oid = ix.indrelid "
+        "JOIN pg_class i ON i.oid = ix.indexrelid "
+        "JOIN pg_am am ON am.oid = i.relam "
+        "LEFT JOIN pg_attribute a "
+        "ON a.attrelid = t.oid AND a.attnum = ix.indkey[0] "
+        "JOIN pg_opclass opc ON opc.oid = ix.indclass[0] "
+        "JOIN pg_namespace n ON n.oid = t.relnamespace "
+        "WHERE am.amname IN ('hnsw', 'ivfflat') "
+        "AND n.nspname = ANY (current_schemas(false)) "
+        f"AND t.relname = {placeholder} "
+        "ORDER BY i.relname"
+    )
+
+
+def index_progress_sql(placeholder: str = "$1") -> str:
+    """Progress of running index builds on the table bound to `placeholder`."""
+    return (
+        "SELECT p.pid, t.relname AS table_name, i.relname AS index_name, "
+        "p.phase, p.blocks_done, p.blocks_total, "
+        "p.tuples_done, p.tuples_total "
+        "FROM pg_stat_progress_create_index p "
+        "JOIN pg_class t ON t.oid = p.relid "
+        "LEFT JOIN pg_class i ON i.oid = p.index_relid "
+        f"WHERE t.relname = {placeholder}"
+    )
+
+
+@dataclass(frozen=True)
+class VectorIndex:
+    name: str
+    table_name: str
+    column: str
+    method: IndexMethod
+    opclass: str
+    valid: bool
+    size_bytes: int
+    definition: str
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> "VectorIndex":
+        return cls(
+            name=row["name"],
+            table_name=row["table_name"],
+            column=row["column_name"],
+            method=IndexMethod(row["method"]),
+            opclass=row["opclass"],
+            valid=bool(row["valid"]),
+            size_bytes=int(row["size_bytes"]),
+            definition=row["definition"],
+        )
+
+    @property
+    def metric(self) -> Optional[SearchMetric]:
+        return metric_for_opclass(self.opclass)
+
+    def serves(self, column: str, metric: SearchMetric) -> bool:
+        """Whether a search on `column` with `metric` can use this index."""
+        return self.valid and self.column == column and self.metric == metric
+
+
+@dataclass(frozen=True)
+class IndexBuildProgress:
+    pid: int
+    table_name: str
+    index_name: Optional[str]
+    phase: str
+    blocks_done: int
+    blocks_total: int
+    tuples_done: int
+    tuples_total: int
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> "IndexBuildProgress":
+        return cls(
+            pid=int(row["pid"]),
+            table_name=row["table_name"],
+            index_name=row["index_name"],
+            phase=row["phase"],
+            blocks_done=int(row["blocks_done"] or 0),
+            blocks_total=int(row["blocks_total"] or 0),
+            tuples_done=int(row["tuples_done"] or 0),
+            tuples_total=int(row["tuples_total"] or 0),
+        )
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """Completion of the current phase, when PostgreSQL reports one."""
+        if self.tuples_total:
+            return self.tuples_done / self.tuples_total
+        if self.blocks_total:
+            return self.blocks_done / self.blocks_total
+        return None
+
+    def __str__(self) -> str:
+        name = self.index_name or self.table_name
+        if self.fraction is None:
+            return f"{name}: {self.phase}"
+        return f"{name}: {self.phase} {self.fraction:.0%}"
+
+
+def warn_if_unindexed(
+    indexes: Sequence[VectorIndex],
+    table_name: str,
+    column: str,
+    metric: SearchMetric,
+) -> None:
+    """Log a warning when no valid index serves searches with `metric`."""
+    if any(index.serves(column, metric) for index in indexes):
+        return
+    available = ", ".join(
+        f"{index.name} ({index.metric.value if index.metric else index.opclass})"
+        for index in indexes
+        if index.column == column
+    )
+    log.warning(
+        "No valid vector index on %s.%s serves %s searches, they fall back to a "
+        "sequential scan%s",
+        table_name,
+        column,
+        metric.value,
+        f" (existing indexes: {available})" if available else "",
+    )
@@ -0,0 +1,126 @@
+"""Streaming COPY ingestion for tables with pgvector columns.
+
+The Prisma query engine cannot run ``COPY``, so this goes through psycopg2 on
+its own connection. Rows are encoded into COPY text format lazily while the
+server reads them, so an arbitrarily large iterator is ingested with bounded
+memory.
+"""
+
+import itertools
+import json
+from datetime import date, datetime, time
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+from psycopg2 import connect
+
+from . import codec
+from .queries import quote_ident
+
+DEFAULT_COPY_CHUNK_SIZE = 10_000
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def encode_copy_value(value: Any) -> str:
+    """Encode one value as a field of PostgreSQL's COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (list, tuple, np.ndarray, memoryview)):
+        return codec.encode_text(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class CopyReader:
+    """File-like object producing COPY text lines from an iterator of rows.
+
+    psycopg2's ``copy_expert`` only needs ``read(size)``; lines are encoded
+    on demand so at most one buffer's worth of rows is held in memory.
+    """
+
+    def __init__(self, rows: Iterable[dict[str, Any]], columns: tuple[str, ...]):
+        self._rows = iter(rows)
+        self._columns = columns
+        self._buffer = ""
+
+    def _encode(self, row: dict[str, Any]) -> str:
+        if row.keys() != set(self._columns):
+            raise ValueError("All rows must provide the same columns")
+        return "\t".join(encode_copy_value(row[col]) for col in self._columns) + "\n"
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += self._encode(row)
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        if not self._buffer:
+            row = next(self._rows, None)
+            if row is not None:
+                self._buffer = self._encode(row)
+        line, sep, rest = self._buffer.partition("\n")
+        self._buffer = rest
+        return line + sep
+
+
+def _chunks(
+    rows: Iterator[dict[str, Any]], size: int
+) -> Iterator[Iterator[dict[str, Any]]]:
+    """Split `rows` into lazily consumed chunks of at most `size` rows."""
+    while True:
+        first = next(rows, None)
+        if first is None:
+            return
+        yield itertools.chain([first], itertools.islice(rows, size - 1))
+
+
+def copy_rows(
+    dsn: str,
+    table_name: str,
+    rows: Iterable[dict[str, Any]],
+    chunk_size: int = DEFAULT_COPY_CHUNK_SIZE,
+    columns: Optional[tuple[str, ...]] = None,
+) -> list[int]:
+    """COPY `rows` into `table_name` and return the number of rows per chunk.
+
+    The column list is taken from the first row unless `columns` is given. All
+    chunks are written in a single transaction which is committed at the end,
+    so either every row is ingested or none is.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if first is None:
+        return []
+    if columns is None:
+        columns = tuple(first.keys())
+    iterator = itertools.chain([first], iterator)
+
+    statement = (
+        f"COPY {quote_ident(table_name)} "
+        f"({', '.join(map(quote_ident, columns))}) FROM STDIN"
+    )
+    counts = []
+    conn = connect(dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            for chunk in _chunks(iterator, chunk_size):
+                cursor.copy_expert(statement, CopyReader(chunk, columns))
+                counts.append(cursor.rowcount)
+    finally:
+        conn.close()
+    return counts
@@ -0,0 +1,281 @@
+"""Opt-in per-action latency and size metrics for the vector actions.
+
+Every instrumented action call is split into stages: ``build`` (SQL
+rendering and parameter encoding), ``engine`` (the round trip through the
+vector engine), ``decode`` (vector parsing) and ``parse`` (model
+validation). Stage and total durations go into histograms, and counters
+track calls, errors, rows returned, bytes of vector text decoded and cache
+hits. They are reported in Prisma's `Metrics` format by
+``VectorPrisma.get_vector_metrics()``.
+
+``span_hook`` opens an OpenTelemetry style span around each call, e.g.
+``span_hook=lambda name, attributes: tracer.start_as_current_span(name,
+attributes=attributes)``; stage durations and counts are set on the span
+when it ends, if it has ``set_attribute``.
+
+Disabled instrumentation (the default) costs one no-op method call per stage.
+"""
+
+import bisect
+import time
+from collections import defaultdict
+from types import TracebackType
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Iterable,
+    Mapping,
+    Optional,
+    Sequence,
+    Sized,
+    Union,
+)
+
+from prisma._metrics import HistogramBucket, Metric, MetricHistogram, Metrics
+
+SpanHook = Callable[[str, Mapping[str, Any]], ContextManager[Any]]
+
+# Upper bounds of the histogram buckets, in milliseconds.
+DEFAULT_BUCKETS = (
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+)
+
+_COUNTERS = {
+    "calls": "Number of action calls",
+    "errors": "Number of action calls that raised",
+    "rows": "Rows returned by the database",
+    "vector_text_bytes": "Bytes of pgvector text decoded",
+    "cache_hits": "Searches answered from the NN result cache",
+    "cache_misses": "Searches that missed the NN result cache",
+    "coalesced": "Searches that awaited an identical search in flight",
+}
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        # the last bucket holds values above every bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_metric(self) -> MetricHistogram:
+        bounds = [*self.bounds, float("inf")]
+        return MetricHistogram(
+            sum=self.sum,
+            count=self.count,
+            buckets=[
+                HistogramBucket(max_value=bound, total_count=count)
+                for bound, count in zip(bounds, self.counts)
+            ],
+        )
+
+
+class ActionTimer:
+    """Times the stages of one action call; use it as a context manager."""
+
+    __slots__ = ("_owner", "_labels", "_span_cm", "_span", "_start", "_last", "_stats")
+
+    enabled = True
+
+    def __init__(
+        self,
+        owner: "VectorInstrumentation",
+        model: str,
+        action: str,
+        span_cm: Optional[ContextManager[Any]],
+    ) -> None:
+        self._owner = owner
+        self._labels = (model, action)
+        self._span_cm = span_cm
+        self._span: Any = None
+        self._stats: dict[str, float] = {}
+
+    def __enter__(self) -> "ActionTimer":
+        if self._span_cm is not None:
+            self._span = self._span_cm.__enter__()
+        self._start = self._last = time.perf_counter()
+        return self
+
+    def lap(self, stage: str, rows: Optional[Sized] = None) -> None:
+        """End `stage` now; `rows` are the rows the stage returned, if any."""
+        now = time.perf_counter()
+        elapsed = (now - self._last) * 1000
+        self._last = now
+        self._stats[f"{stage}_ms"] = self._stats.get(f"{stage}_ms", 0.0) + elapsed
+        self._owner._observe(self._labels, stage, elapsed)
+        if rows is not None:
+            self.count("rows", len(rows))
+
+    def count(self, counter: str, value: int = 1) -> None:
+        self._stats[counter] = self._stats.get(counter, 0) + value
+        key = (counter, *self._labels)
+        self._owner._counters[key] += value
+
+    def count_vector_bytes(
+        self, rows: Iterable[Mapping[str, Any]], columns: Iterable[str]
+    ) -> None:
+        """Count the pgvector text of `columns` in `rows` about to be decoded."""
+        columns = tuple(columns)
+        size = sum(
+            len(value)
+            for row in rows
+            for column in columns
+            if isinstance(value := row.get(column), str)
+        )
+        if size:
+            self.count("vector_text_bytes", size)
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        elapsed = (time.perf_counter() - self._start) * 1000
+        self._owner._observe(self._labels, "total", elapsed)
+        self.count("calls")
+        if exc_type is not None:
+            self.count("errors")
+        if self._span_cm is None:
+            return
+        set_attribute = getattr(self._span, "set_attribute", None)
+        if set_attribute is not None:
+            set_attribute("vector_prisma.duration_ms", elapsed)
+            for key, value in self._stats.items():
+                set_attribute(f"vector_prisma.{key}", value)
+        self._span_cm.__exit__(exc_type, exc, traceback)
+
+
+class _NoopTimer:
+    """Stands in for `ActionTimer` when instrumentation is disabled."""
+
+    __slots__ = ()
+
+    enabled = False
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def lap(self, stage: str, rows: Optional[Sized] = None) -> None:
+        pass
+
+    def count(self, counter: str, value: int = 1) -> None:
+        pass
+
+    def count_vector_bytes(
+        self, rows: Iterable[Mapping[str, Any]], columns: Iterable[str]
+    ) -> None:
+        pass
+
+
+NOOP_TIMER = _NoopTimer()
+
+Timer = Union[ActionTimer, _NoopTimer]
+
+
+class VectorInstrumentation:
+    """Collects per-model, per-action stage timings and counters.
+
+    Enable it with ``VectorPrisma(instrumentation=True)`` or pass an instance
+    to customize the histogram `buckets` (in ms) or add a `span_hook`.
+    """
+
+    def __init__(
+        self,
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        span_hook: Optional[SpanHook] = None,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.span_hook = span_hook
+        self._histograms: dict[tuple[str, str, str], _Histogram] = {}
+        self._counters: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+
+    def timer(self, model: str, action: str) -> ActionTimer:
+        span_cm = None
+        if self.span_hook is not None:
+            span_cm = self.span_hook(
+                f"vector_prisma.{action}",
+                {
+                    "db.system": "postgresql",
+                    "vector_prisma.model": model,
+                    "vector_prisma.action": action,
+                },
+            )
+        return ActionTimer(self, model, action, span_cm)
+
+    def _observe(self, labels: tuple[str, str], stage: str, value: float) -> None:
+        key = (*labels, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram(self.buckets)
+        histogram.observe(value)
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self._counters.clear()
+
+    def metrics(self, global_labels: Optional[Mapping[str, str]] = None) -> Metrics:
+        labels = dict(global_labels or {})
+        return Metrics(
+            counters=[
+                Metric[int](
+                    key=f"vector_prisma_{counter}_total",
+                    value=value,
+                    labels={**labels, "model": model, "action": action},
+                    description=_COUNTERS.get(counter, counter),
+                )
+                for (counter, model, action), value in sorted(self._counters.items())
+            ],
+            gauges=[],
+            histograms=[
+                Metric[MetricHistogram](
+                    key=(
+                        "vector_prisma_action_duration_ms"
+                        if stage == "total"
+                        else "vector_prisma_stage_duration_ms"
+                    ),
+                    value=histogram.to_metric(),
+                    labels={
+                        **labels,
+                        "model": model,
+                        "action": action,
+                        **({} if stage == "total" else {"stage": stage}),
+                    },
+                    description=(
+                        "Duration of vector action calls"
+                        if stage == "total"
+                        else "Duration of one stage of vector action calls"
+                    ),
+                )
+                for (model, action, stage), histogram in sorted(
+                    self._histograms.items()
+                )
+            ],
+        )
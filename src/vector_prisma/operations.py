@@ -1,4 +1,8 @@
+from dataclasses import dataclass, replace
 from enum import Enum
+from typing import Optional
+
+from . import codec
 
 
 class SearchMetric(str, Enum):
@@ -8,30 +12,156 @@ class SearchMetric(str, Enum):
     COSINE_DISTANCE = "COSINE_DISTANCE"
 
 
-def get_pgvector_operation(
-    column_name: str, query_vec: list[float], metric: SearchMetric
-) -> str:
-    vec_str = ", ".join(map(str, query_vec))
-    op = ""
-
+def get_pgvector_operator(metric: SearchMetric) -> str:
     if metric == SearchMetric.L1_DISTANCE:
-        op = "<+>"
+        return "<+>"
     elif metric == SearchMetric.L2_DISTANCE:
-        op = "<->"
+        return "<->"
     elif metric == SearchMetric.INNER_PRODUCT:
-        op = "<#>"
+        return "<#>"
     elif metric == SearchMetric.COSINE_DISTANCE:
-        if not any(query_vec):
-            raise ValueError("Cosine distance is not defined for zero vectors")
-        op = "<=>"
+        return "<=>"
     else:
         raise ValueError(f"Invalid distance type: {metric}")
 
-    return f"{column_name} {op} '[{vec_str}]'"
+
+def validate_query_vector(query_vec: codec.VectorLike, metric: SearchMetric) -> None:
+    if metric == SearchMetric.COSINE_DISTANCE and not codec.as_vector(query_vec).any():
+        raise ValueError("Cosine distance is not defined for zero vectors")
+
+
+def get_pgvector_operation(
+    column_name: str, query_vec: codec.VectorLike, metric: SearchMetric
+) -> str:
+    """Render a distance expression with `query_vec` inlined as a literal.
+
+    The statement builders bind the query vector as a parameter instead, which
+    keeps statement text stable; this is kept for ad-hoc SQL.
+    """
+    op = get_pgvector_operator(metric)
+    validate_query_vector(query_vec, metric)
+
+    return f"{column_name} {op} '{codec.encode_text(query_vec)}'"
 
 
 def vec_str2vec(vec_str: str) -> list[float]:
     """
     文字列の形式 例"[1.0, 2.0, 3.0]" をfloatリスト [1.0, 2.0, 3.0] に変換する関数
     """
-    return list(map(float, vec_str[1:-1].split(",")))
+    return codec.decode_text(vec_str).tolist()
+
+
+class IterativeScan(str, Enum):
+    """pgvector (>= 0.8) iterative index scan modes for filtered searches."""
+
+    STRICT_ORDER = "strict_order"
+    RELAXED_ORDER = "relaxed_order"
+
+
+def get_iterative_scan_settings(mode: IterativeScan) -> dict[str, str]:
+    """Return the settings enabling iterative scans for HNSW and IVFFlat indexes.
+
+    IVFFlat only supports relaxed ordering, so strict ordering is HNSW only.
+    """
+    mode = IterativeScan(mode)
+    settings = {"hnsw.iterative_scan": mode.value}
+    if mode == IterativeScan.RELAXED_ORDER:
+        settings["ivfflat.iterative_scan"] = mode.value
+    return settings
+
+
+class Quantization(str, Enum):
+    """Compressed forms of a vector column for two-stage (rerank) searches.
+
+    BINARY keeps one bit per dimension and compares by Hamming distance,
+    HALFVEC keeps float16 values and compares with the search metric.
+    """
+
+    BINARY = "binary"
+    HALFVEC = "halfvec"
+
+
+class Fusion(str, Enum):
+    """How `hybrid_search` merges the vector and full-text rankings.
+
+    RRF (reciprocal rank fusion) scores each row by the weighted sum of
+    ``1 / (k + rank)`` over the rankings it appears in.
+    """
+
+    RRF = "rrf"
+
+
+@dataclass(frozen=True)
+class SearchOptions:
+    """Per-statement recall / latency knobs for nearest neighbor searches.
+
+    `ef_search` sets `hnsw.ef_search` (candidate list size, 1-1000) and
+    `probes` sets `ivfflat.probes` (lists scanned). `exact` disables index
+    scans so the search is an exact sequential scan. Fields left as None
+    keep the server's setting.
+    """
+
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    exact: Optional[bool] = None
+    iterative_scan: Optional[IterativeScan] = None
+
+    def __post_init__(self) -> None:
+        if self.ef_search is not None and not 1 <= self.ef_search <= 1000:
+            raise ValueError(f"ef_search must be between 1 and 1000: {self.ef_search}")
+        if self.probes is not None and self.probes < 1:
+            raise ValueError(f"probes must be positive: {self.probes}")
+
+    def merge(
+        self,
+        *,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: Optional[bool] = None,
+        iterative_scan: Optional[IterativeScan] = None,
+    ) -> "SearchOptions":
+        """Return a copy with every override that is not None applied."""
+        return replace(
+            self,
+            ef_search=self.ef_search if ef_search is None else ef_search,
+            probes=self.probes if probes is None else probes,
+            exact=self.exact if exact is None else exact,
+            iterative_scan=(
+                self.iterative_scan if iterative_scan is None else iterative_scan
+            ),
+        )
+
+    def settings(self) -> dict[str, str]:
+        """Return the settings to apply to the search's transaction."""
+        if self.exact:
+            return {"enable_indexscan": "off"}
+        settings = {}
+        if self.ef_search is not None:
+            settings["hnsw.ef_search"] = str(self.ef_search)
+        if self.probes is not None:
+            settings["ivfflat.probes"] = str(self.probes)
+        if self.iterative_scan is not None:
+            settings.update(get_iterative_scan_settings(self.iterative_scan))
+        return settings
+
+
+@dataclass(frozen=True)
+class MMR:
+    """Maximal marginal relevance reranking of a search, see `retrieve(mmr=...)`.
+
+    `lambda_mult` weighs relevance to the query against diversity (1.0 is a
+    plain nearest neighbor ranking, 0.0 maximum diversity). `fetch_k`
+    candidates (default four times `top_k`) are fetched with their vectors
+    and the results are picked from them; `metric` compares candidates with
+    each other and defaults to the search metric.
+    """
+
+    lambda_mult: float = 0.5
+    fetch_k: Optional[int] = None
+    metric: Optional[SearchMetric] = None
+
+    def __post_init__(self) -> None:
+        if not 0.0 <= self.lambda_mult <= 1.0:
+            raise ValueError(f"lambda_mult must be between 0 and 1: {self.lambda_mult}")
+        if self.fetch_k is not None and self.fetch_k < 1:
+            raise ValueError(f"fetch_k must be positive: {self.fetch_k}")
@@ -0,0 +1,258 @@
+"""Pipelined vector writes for ``tx_vec(pipeline=True)``.
+
+Inside a pipelined transaction the write actions (``create``, ``update``,
+``upsert``, ``delete``, ``create_many``, ``upsert_many``, ``update_many`` and
+``delete_many``) do not wait for the database: they queue their statement and
+return a `Deferred`. Queued statements are sent in order as one engine batch
+when `pipeline_size` of them are waiting, when a `Deferred` is awaited, on
+``flush_vec()``, before any vector read and when the transaction commits.
+
+A failing statement raises `PipelineError`, which names the action and the
+position of the statement that caused it; the transaction is then rolled
+back as usual.
+"""
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generator,
+    Generic,
+    Mapping,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
+
+from .execution import BatchError
+
+if TYPE_CHECKING:
+    from prisma import Prisma
+
+    from .engine import VectorEngine
+
+_T = TypeVar("_T")
+
+DEFAULT_PIPELINE_SIZE = 100
+
+_PENDING = object()
+
+
+class PipelineError(Exception):
+    """A queued statement failed, or was not run because an earlier one did."""
+
+    def __init__(
+        self, message: str, *, index: Optional[int] = None, action: str = ""
+    ) -> None:
+        super().__init__(message)
+        self.index = index
+        """Position of the failing statement among those queued in the transaction."""
+        self.action = action
+
+
+class Deferred(Generic[_T]):
+    """The result of a queued vector write, available once it was sent."""
+
+    __slots__ = ("_pipeline", "_value", "_error")
+
+    def __init__(self, pipeline: Optional["StatementPipeline"]) -> None:
+        self._pipeline = pipeline
+        self._value: Any = _PENDING
+        self._error: Optional[BaseException] = None
+
+    def done(self) -> bool:
+        return self._value is not _PENDING or self._error is not None
+
+    def result(self) -> _T:
+        """The result; raises if the statement failed or was not sent yet."""
+        if self._error is not None:
+            raise self._error
+        if self._value is _PENDING:
+            raise RuntimeError("The statement has not been sent yet, flush first")
+        return self._value
+
+    def _set_result(self, value: Any) -> None:
+        self._value = value
+
+    def _set_error(self, error: BaseException) -> None:
+        self._error = error
+
+    def __await__(self) -> Generator[Any, None, _T]:
+        if not self.done() and self._pipeline is not None:
+            yield from self._pipeline.flush().__await__()
+        return self.result()
+
+    @staticmethod
+    def combine(
+        parts: Sequence[Union["Deferred[Any]", Any]],
+        func: Callable[[list[Any]], _T],
+    ) -> Union["Deferred[_T]", _T]:
+        """`func` of the results of `parts`, deferred if any part is."""
+        deferred = [part for part in parts if isinstance(part, Deferred)]
+        if not deferred:
+            return func(list(parts))
+        return _Combined(deferred[0]._pipeline, parts, func)
+
+
+class _Combined(Deferred[_T]):
+    __slots__ = ("_parts", "_func")
+
+    def __init__(
+        self,
+        pipeline: Optional["StatementPipeline"],
+        parts: Sequence[Any],
+        func: Callable[[list[Any]], _T],
+    ) -> None:
+        super().__init__(pipeline)
+        self._parts = parts
+        self._func = func
+
+    def done(self) -> bool:
+        return all(part.done() for part in self._parts if isinstance(part, Deferred))
+
+    def result(self) -> _T:
+        return self._func(
+            [
+                part.result() if isinstance(part, Deferred) else part
+                for part in self._parts
+            ]
+        )
+
+
+class _Statement:
+    __slots__ = ("method", "query", "values", "parse", "action", "deferred")
+
+    def __init__(
+        self,
+        method: str,
+        query: str,
+        values: list[Any],
+        parse: Optional[Callable[[Any], Any]],
+        action: str,
+        deferred: Deferred[Any],
+    ) -> None:
+        self.method = method
+        self.query = query
+        self.values = values
+        self.parse = parse
+        self.action = action
+        self.deferred = deferred
+
+
+class StatementPipeline:
+    """Queues vector writes and sends them to `engine` in ordered batches.
+
+    Stands in for the client's vector engine while a pipelined `tx_vec()` is
+    open: reads go straight to the engine after the queue is flushed.
+    """
+
+    def __init__(
+        self,
+        client: "Prisma",
+        engine: "VectorEngine",
+        size: int = DEFAULT_PIPELINE_SIZE,
+    ) -> None:
+        if size < 1:
+            raise ValueError("pipeline_size must be positive")
+        self._client = client
+        self._engine = engine
+        self._size = size
+        self._queue: list[_Statement] = []
+        self._sent = 0
+        self._error: Optional[PipelineError] = None
+
+    @property
+    def text_vectors(self) -> bool:
+        return self._engine.text_vectors
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def enqueue(
+        self,
+        method: str,
+        query: str,
+        values: list[Any],
+        parse: Optional[Callable[[Any], Any]] = None,
+        action: str = "",
+    ) -> Deferred[Any]:
+        """Queue a ``"query"`` or ``"execute"`` statement; `parse` maps its result."""
+        if self._error is not None:
+            raise self._error
+        deferred: Deferred[Any] = Deferred(self)
+        self._queue.append(_Statement(method, query, values, parse, action, deferred))
+        if len(self._queue) >= self._size:
+            await self.flush()
+        return deferred
+
+    async def flush(self) -> None:
+        """Send every queued statement; raises `PipelineError` if one fails."""
+        if self._error is not None:
+            raise self._error
+        if not self._queue:
+            return
+        batch, self._queue = self._queue, []
+        start, self._sent = self._sent, self._sent + len(batch)
+        try:
+            results = await self._engine.batch(
+                self._client,
+                [(stmt.method, stmt.query, stmt.values) for stmt in batch],
+            )
+        except BatchError as err:
+            cause = err.__cause__ or err
+            raise self._fail(batch, start, err.index, cause) from cause
+        except BaseException as err:
+            self._fail(batch, start, None, err)
+            raise
+
+        for stmt, result in zip(batch, results):
+            try:
+                value = stmt.parse(result) if stmt.parse is not None else result
+            except Exception as err:  # a bad row only fails its own statement
+                stmt.deferred._set_error(err)
+            else:
+                stmt.deferred._set_result(value)
+
+    def _fail(
+        self,
+        batch: list[_Statement],
+        start: int,
+        index: Optional[int],
+        cause: BaseException,
+    ) -> PipelineError:
+        if index is None:
+            error = PipelineError(f"A pipelined vector batch failed: {cause}")
+        else:
+            stmt = batch[index]
+            error = PipelineError(
+                f"Pipelined statement {start + index} ({stmt.action}) failed: {cause}",
+                index=start + index,
+                action=stmt.action,
+            )
+        error.__cause__ = cause
+        self._error = error
+        for stmt in batch:
+            stmt.deferred._set_error(error)
+        return error
+
+    def discard(self) -> None:
+        """Drop the queued statements, e.g. when the transaction rolls back."""
+        error = PipelineError("The transaction was rolled back before the flush")
+        for stmt in self._queue:
+            stmt.deferred._set_error(error)
+        self._queue = []
+
+    async def query(
+        self,
+        client: "Prisma",
+        query: str,
+        values: Sequence[Any],
+        settings: Mapping[str, str] = {},
+    ) -> list[dict[str, Any]]:
+        await self.flush()
+        return await self._engine.query(client, query, values, settings)
+
+    async def execute(self, client: "Prisma", query: str, values: Sequence[Any]) -> int:
+        await self.flush()
+        return await self._engine.execute(client, query, values)
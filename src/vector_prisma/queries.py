@@ -1,8 +1,819 @@
-from typing import Any
+import re
+from functools import lru_cache
+from typing import AbstractSet, Any, Mapping, Sequence, Union
 
-from psycopg2 import sql
+from . import codec
+from .operations import (
+    Fusion,
+    Quantization,
+    SearchMetric,
+    get_pgvector_operator,
+    validate_query_vector,
+)
 
-from .operations import SearchMetric, get_pgvector_operation
+# Maximum number of compiled statements kept per statement kind. Each entry is
+# keyed by (table, column set, operation shape) so hot queries are only
+# rendered once per process.
+STATEMENT_CACHE_SIZE = 1024
+
+# PostgreSQL's wire protocol allows at most 65535 bind parameters per
+# statement; the Prisma query engine caps PostgreSQL statements at half that.
+MAX_QUERY_PARAMETERS = 32767
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Rank offset of reciprocal rank fusion; 60 is the value from the original paper.
+DEFAULT_RRF_K = 60
+
+# Column carrying the 1-based position of the query vector in batched searches.
+QUERY_INDEX_COLUMN = "_query_index"
+
+# Column carrying the 1-based position of a row's group in grouped searches.
+GROUP_INDEX_COLUMN = "_group_index"
+
+# Candidate rows a grouped search ranks per requested row, by default.
+DEFAULT_GROUP_CANDIDATES_FACTOR = 10
+
+# Prisma style ordering: {"column": "asc" | "desc"} or a list of such dicts.
+OrderBy = Union[Mapping[str, str], Sequence[Mapping[str, str]]]
+
+
+def quote_ident(name: str) -> str:
+    """Quote an SQL identifier the same way PostgreSQL's quote_ident() does."""
+    if "\x00" in name:
+        raise ValueError(f"Identifier contains a NUL character: {name!r}")
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _select_list(
+    columns: tuple[str, ...], vector_columns: frozenset[str], prefix: str = ""
+) -> str:
+    return ", ".join(
+        f"{prefix}{quote_ident(col)}::text"
+        if col in vector_columns
+        else f"{prefix}{quote_ident(col)}"
+        for col in columns
+    )
+
+
+def _text_columns(vector_column: str, text_vectors: bool) -> frozenset[str]:
+    return frozenset((vector_column,)) if text_vectors else frozenset()
+
+
+def _returned(vector_columns: frozenset[str], text_vectors: bool) -> frozenset[str]:
+    return vector_columns if text_vectors else frozenset()
+
+
+def _bind_vector(value: Any, text_vectors: bool) -> Any:
+    """Encode a vector parameter for the engine, leaving NULL as is.
+
+    Any float sequence, ndarray or buffer is accepted; float32 arrays reach
+    the native engine without being copied.
+    """
+    if value is None:
+        return None
+    return codec.encode_text(value) if text_vectors else codec.as_vector(value)
+
+
+def _bind(
+    row: dict[str, Any], vector_columns: AbstractSet[str], text_vectors: bool
+) -> list[Any]:
+    return [
+        _bind_vector(value, text_vectors) if col in vector_columns else value
+        for col, value in row.items()
+    ]
+
+
+# (column, list length or None, cast) per `where` entry.
+WhereShape = tuple[tuple[str, int | None, str | None], ...]
+
+
+def _where_shape(
+    where: dict[str, Any], column_types: Mapping[str, str] = {}
+) -> WhereShape:
+    return tuple(
+        (
+            attr,
+            len(value) if isinstance(value, list) else None,
+            column_types.get(attr),
+        )
+        for attr, value in where.items()
+    )
+
+
+def _where_clause(shape: WhereShape, start: int) -> tuple[str, int]:
+    """Render `shape` as `$n` predicates joined by AND, numbered from `start`.
+
+    Parameters are cast to the column type, if known, since raw parameters
+    are bound untyped.
+    """
+    clauses = []
+    index = start
+    for attr, size, cast in shape:
+        suffix = f"::{cast}" if cast else ""
+        if size is None:
+            clauses.append(f"{quote_ident(attr)} = ${index}{suffix}")
+            index += 1
+        elif size == 0:
+            # IN () is a syntax error; an empty list matches no row
+            clauses.append("FALSE")
+        else:
+            placeholders = ", ".join(
+                f"${j}{suffix}" for j in range(index, index + size)
+            )
+            clauses.append(f"{quote_ident(attr)} IN ({placeholders})")
+            index += size
+    return " AND ".join(clauses), index
+
+
+def _list_param(value: Any) -> Any:
+    return list(value) if isinstance(value, tuple) else value
+
+
+def _where_values(where: dict[str, Any]) -> list[Any]:
+    values: list[Any] = []
+    for value in where.values():
+        if isinstance(value, list):
+            values.extend(value)
+        else:
+            values.append(value)
+    return values
+
+
+def _placeholder(
+    index: int,
+    col: str,
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    if col in uuid_columns:
+        return f"${index}::uuid"
+    if col in vector_columns:
+        # vector casts implicitly to halfvec, so this also serves halfvec columns
+        return f"${index}::vector"
+    if col in bit_columns:
+        return f"${index}::varbit"
+    return f"${index}"
+
+
+def _placeholders(
+    columns: tuple[str, ...],
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    start: int = 1,
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    return ", ".join(
+        _placeholder(i, col, uuid_columns, vector_columns, bit_columns)
+        for i, col in enumerate(columns, start)
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _insert_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    text_vectors: bool,
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    placeholders = _placeholders(columns, uuid_columns, vector_columns, 1, bit_columns)
+    return (
+        f"INSERT INTO {quote_ident(table_name)} "
+        f"({', '.join(map(quote_ident, columns))}) "
+        f"VALUES ({placeholders}) "
+        f"RETURNING {_select_list(columns, _returned(vector_columns, text_vectors))}"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _update_sql(
+    table_name: str,
+    set_columns: tuple[str, ...],
+    where_shape: WhereShape,
+    return_columns: tuple[str, ...],
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    text_vectors: bool,
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    set_str = ", ".join(
+        f"{quote_ident(col)} = "
+        f"{_placeholder(i, col, uuid_columns, vector_columns, bit_columns)}"
+        for i, col in enumerate(set_columns, 1)
+    )
+    where_str, _ = _where_clause(where_shape, len(set_columns) + 1)
+    returned = _returned(vector_columns, text_vectors)
+    return (
+        f"UPDATE {quote_ident(table_name)} SET {set_str} "
+        f"WHERE {where_str} "
+        f"RETURNING {_select_list(return_columns, returned)}"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _upsert_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    conflict_target: tuple[str, ...],
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    text_vectors: bool,
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    update_str = ", ".join(
+        f"{quote_ident(col)} = EXCLUDED.{quote_ident(col)}" for col in columns
+    )
+    placeholders = _placeholders(columns, uuid_columns, vector_columns, 1, bit_columns)
+    return (
+        f"INSERT INTO {quote_ident(table_name)} "
+        f"({', '.join(map(quote_ident, columns))}) "
+        f"VALUES ({placeholders}) "
+        f"ON CONFLICT ({', '.join(map(quote_ident, conflict_target))}) "
+        f"DO UPDATE SET {update_str} "
+        f"RETURNING {_select_list(columns, _returned(vector_columns, text_vectors))}"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _insert_many_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    row_count: int,
+    conflict_target: tuple[str, ...] | None,
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    text_vectors: bool,
+    returning: bool,
+    bit_columns: frozenset[str] = frozenset(),
+) -> str:
+    rows_str = ", ".join(
+        "("
+        + _placeholders(columns, uuid_columns, vector_columns, start, bit_columns)
+        + ")"
+        for start in range(1, row_count * len(columns) + 1, len(columns))
+    )
+    query = (
+        f"INSERT INTO {quote_ident(table_name)} "
+        f"({', '.join(map(quote_ident, columns))}) "
+        f"VALUES {rows_str}"
+    )
+    if conflict_target is not None:
+        update_str = ", ".join(
+            f"{quote_ident(col)} = EXCLUDED.{quote_ident(col)}" for col in columns
+        )
+        query += (
+            f" ON CONFLICT ({', '.join(map(quote_ident, conflict_target))})"
+            f" DO UPDATE SET {update_str}"
+        )
+    if returning:
+        returned = _returned(vector_columns, text_vectors)
+        query += f" RETURNING {_select_list(columns, returned)}"
+    return query
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _find_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    where_shape: WhereShape,
+    vector_columns: frozenset[str],
+    text_vectors: bool,
+    order: tuple[tuple[str, str], ...] = (),
+    keyset_casts: tuple[str | None, ...] | None = None,
+    has_take: bool = False,
+    has_skip: bool = False,
+) -> str:
+    query = (
+        f"SELECT {_select_list(columns, _returned(vector_columns, text_vectors))} "
+        f"FROM {quote_ident(table_name)}"
+    )
+    where_str, index = _where_clause(where_shape, 1)
+    if keyset_casts is not None:
+        keyset_str = _keyset_clause(order, keyset_casts, index)
+        where_str = f"{where_str} AND {keyset_str}" if where_str else keyset_str
+        index += len(order)
+    if where_str:
+        query += f" WHERE {where_str}"
+    if order:
+        query += " ORDER BY " + ", ".join(
+            f"{quote_ident(col)} {direction.upper()}" for col, direction in order
+        )
+    if has_take:
+        query += f" LIMIT ${index}"
+        index += 1
+    if has_skip:
+        query += f" OFFSET ${index}"
+    return query
+
+
+def normalize_order_by(
+    order_by: OrderBy | None,
+    columns: Sequence[str],
+) -> tuple[tuple[str, str], ...]:
+    """Turn a Prisma style `order_by` into ``((column, "asc" | "desc"), ...)``.
+
+    Accepts ``{"created_at": "desc"}`` or a list of such single-key dicts.
+    """
+    if not order_by:
+        return ()
+    items = [order_by] if isinstance(order_by, Mapping) else order_by
+    order = []
+    for item in items:
+        for col, direction in item.items():
+            if col not in columns:
+                raise ValueError(f"Cannot order by unknown column {col!r}")
+            if direction not in ("asc", "desc"):
+                raise ValueError(
+                    f"Order direction must be 'asc' or 'desc': {direction!r}"
+                )
+            order.append((col, direction))
+    return tuple(order)
+
+
+def select_columns(
+    columns: Sequence[str],
+    select: Sequence[str] | None = None,
+    exclude: AbstractSet[str] = frozenset(),
+    required: Sequence[str] = (),
+) -> tuple[str, ...]:
+    """The columns to fetch: `select` (default: all `columns`) minus `exclude`.
+
+    `required` columns (the primary key, keyset columns) are always fetched.
+    """
+    if select is not None:
+        unknown = [col for col in select if col not in columns]
+        if unknown:
+            raise ValueError(f"Cannot select unknown columns: {', '.join(unknown)}")
+    selected = [
+        col for col in (columns if select is None else select) if col not in exclude
+    ]
+    selected += [col for col in required if col not in selected]
+    return tuple(dict.fromkeys(selected))
+
+
+def _keyset_clause(
+    order: tuple[tuple[str, str], ...], casts: tuple[str | None, ...], start: int
+) -> str:
+    """Render "rows after the bound key" for `order`, numbered from `start`.
+
+    A single direction uses a row comparison, which an index on the order
+    columns can serve; mixed directions expand into an OR of prefixes.
+    """
+    params = [
+        f"${i}::{cast}" if cast else f"${i}" for i, cast in enumerate(casts, start)
+    ]
+    directions = {direction for _, direction in order}
+    if len(directions) == 1:
+        op = ">" if directions == {"asc"} else "<"
+        cols = ", ".join(quote_ident(col) for col, _ in order)
+        return f"({cols}) {op} ({', '.join(params)})"
+    clauses = []
+    for i, (col, direction) in enumerate(order):
+        terms = [
+            f"{quote_ident(c)} = {params[j]}" for j, (c, _) in enumerate(order[:i])
+        ]
+        terms.append(
+            f"{quote_ident(col)} {'>' if direction == 'asc' else '<'} {params[i]}"
+        )
+        clauses.append("(" + " AND ".join(terms) + ")")
+    return "(" + " OR ".join(clauses) + ")"
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _delete_sql(
+    table_name: str,
+    where_shape: WhereShape,
+    return_columns: tuple[str, ...] = (),
+    vector_columns: frozenset[str] = frozenset(),
+    text_vectors: bool = True,
+) -> str:
+    where_str, _ = _where_clause(where_shape, 1)
+    query = f"DELETE FROM {quote_ident(table_name)} WHERE {where_str}"
+    if return_columns:
+        returned = _returned(vector_columns, text_vectors)
+        query += f" RETURNING {_select_list(return_columns, returned)}"
+    return query
+
+
+def _match_shape(where: dict[str, Any]) -> tuple[tuple[str, bool], ...]:
+    return tuple(
+        (attr, isinstance(value, (list, tuple))) for attr, value in where.items()
+    )
+
+
+def _match_clause(
+    shape: tuple[tuple[str, bool], ...],
+    casts: tuple[str | None, ...],
+    start: int,
+    prefix: str = "",
+) -> tuple[str, int]:
+    """Render set-based predicates, numbered from `start`.
+
+    A list value is bound as one array parameter (``col = ANY($n::type[])``),
+    so the statement does not depend on the list length and is not limited
+    by the bind parameter cap.
+    """
+    clauses = []
+    for index, ((attr, is_list), cast) in enumerate(zip(shape, casts), start):
+        column = f"{prefix}{quote_ident(attr)}"
+        if is_list:
+            param = f"${index}::{cast}[]" if cast else f"${index}"
+            clauses.append(f"{column} = ANY({param})")
+        else:
+            param = f"${index}::{cast}" if cast else f"${index}"
+            clauses.append(f"{column} = {param}")
+    return " AND ".join(clauses), start + len(shape)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _delete_many_sql(
+    table_name: str,
+    match_shape: tuple[tuple[str, bool], ...],
+    casts: tuple[str | None, ...],
+) -> str:
+    query = f"DELETE FROM {quote_ident(table_name)}"
+    where_str, _ = _match_clause(match_shape, casts, 1)
+    return f"{query} WHERE {where_str}" if where_str else query
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _update_many_sql(
+    table_name: str,
+    set_columns: tuple[str, ...],
+    match_shape: tuple[tuple[str, bool], ...],
+    casts: tuple[str | None, ...],
+    uuid_columns: frozenset[str],
+    vector_columns: frozenset[str],
+    bit_columns: frozenset[str],
+) -> str:
+    set_str = ", ".join(
+        f"{quote_ident(col)} = "
+        f"{_placeholder(i, col, uuid_columns, vector_columns, bit_columns)}"
+        for i, col in enumerate(set_columns, 1)
+    )
+    query = f"UPDATE {quote_ident(table_name)} SET {set_str}"
+    where_str, _ = _match_clause(match_shape, casts, len(set_columns) + 1)
+    return f"{query} WHERE {where_str}" if where_str else query
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _update_rows_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    key_columns: tuple[str, ...],
+    row_count: int,
+    column_casts: tuple[str | None, ...],
+    match_shape: tuple[tuple[str, bool], ...],
+    casts: tuple[str | None, ...],
+) -> str:
+    """UPDATE ... FROM (VALUES ...): each row sets its own values.
+
+    The first VALUES row carries the casts, which type the whole column.
+    """
+    rows = []
+    for start in range(1, row_count * len(columns) + 1, len(columns)):
+        params = [f"${i}" for i in range(start, start + len(columns))]
+        if start == 1:
+            params = [
+                f"{param}::{cast}" if cast else param
+                for param, cast in zip(params, column_casts)
+            ]
+        rows.append(f"({', '.join(params)})")
+    set_str = ", ".join(
+        f"{quote_ident(col)} = v.{quote_ident(col)}"
+        for col in columns
+        if col not in key_columns
+    )
+    where_str = " AND ".join(
+        f"t.{quote_ident(col)} = v.{quote_ident(col)}" for col in key_columns
+    )
+    match_str, _ = _match_clause(
+        match_shape, casts, row_count * len(columns) + 1, prefix="t."
+    )
+    if match_str:
+        where_str = f"{where_str} AND {match_str}"
+    return (
+        f"UPDATE {quote_ident(table_name)} AS t SET {set_str} "
+        f"FROM (VALUES {', '.join(rows)}) "
+        f"AS v({', '.join(map(quote_ident, columns))}) "
+        f"WHERE {where_str}"
+    )
+
+
+def quantized_expression(column_expr: str, quantization: Quantization, dim: int) -> str:
+    """Quantized form of a vector expression, as indexed for rerank searches."""
+    if Quantization(quantization) == Quantization.BINARY:
+        return f"binary_quantize({column_expr})::bit({dim})"
+    return f"{column_expr}::halfvec({dim})"
+
+
+def _quantized_distance(
+    column_expr: str,
+    query_expr: str,
+    metric: SearchMetric,
+    quantization: Quantization,
+    dim: int,
+) -> str:
+    if Quantization(quantization) == Quantization.BINARY:
+        operator = "<~>"
+    else:
+        operator = get_pgvector_operator(metric)
+    return (
+        f"{quantized_expression(column_expr, quantization, dim)} {operator} "
+        f"{quantized_expression(query_expr, quantization, dim)}"
+    )
+
+
+def _distance_filter(
+    where_shape: WhereShape,
+    distance_expr: str | None,
+    start: int,
+) -> str:
+    """Render the WHERE clause of an NN statement, or "" when unfiltered.
+
+    Predicates are numbered from `start`; when `distance_expr` is given, a
+    `distance_expr < $n` threshold is bound to the parameter after them.
+    """
+    where_str, index = _where_clause(where_shape, start)
+    if distance_expr is not None:
+        distance_str = f"{distance_expr} < ${index}"
+        where_str = f"{where_str} AND {distance_str}" if where_str else distance_str
+    return f"WHERE {where_str} " if where_str else ""
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _nn_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    vector_column: str,
+    metric: SearchMetric,
+    where_shape: WhereShape,
+    has_max_distance: bool,
+    text_vectors: bool,
+    vector_type: str = "vector",
+) -> str:
+    distance_expr = (
+        f"{quote_ident(vector_column)} {get_pgvector_operator(metric)} "
+        f"$2::{vector_type}"
+    )
+    filter_str = _distance_filter(
+        where_shape, distance_expr if has_max_distance else None, 3
+    )
+    select_str = _select_list(columns, _text_columns(vector_column, text_vectors))
+    return (
+        f"SELECT {select_str}, "
+        f"{distance_expr} AS distance "
+        f"FROM {quote_ident(table_name)} "
+        f"{filter_str}"
+        "ORDER BY distance "
+        "LIMIT $1"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _nn_many_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    vector_column: str,
+    metric: SearchMetric,
+    where_shape: WhereShape,
+    has_max_distance: bool,
+    text_vectors: bool,
+    vector_type: str = "vector",
+) -> str:
+    distance_expr = (
+        f"{quote_ident(vector_column)} {get_pgvector_operator(metric)} q.query_vec"
+    )
+    filter_str = _distance_filter(
+        where_shape, distance_expr if has_max_distance else None, 3
+    )
+    select_str = _select_list(columns, _text_columns(vector_column, text_vectors))
+    return (
+        f"SELECT q.ordinality AS {quote_ident(QUERY_INDEX_COLUMN)}, c.* "
+        f"FROM unnest($1::text::{vector_type}[]) "
+        "WITH ORDINALITY AS q(query_vec, ordinality) "
+        "CROSS JOIN LATERAL ("
+        f"SELECT {select_str}, "
+        f"{distance_expr} AS distance "
+        f"FROM {quote_ident(table_name)} "
+        f"{filter_str}"
+        "ORDER BY distance "
+        "LIMIT $2"
+        ") AS c "
+        "ORDER BY q.ordinality, c.distance"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _nn_rerank_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    vector_column: str,
+    metric: SearchMetric,
+    where_shape: WhereShape,
+    has_max_distance: bool,
+    text_vectors: bool,
+    vector_type: str,
+    quantization: Quantization,
+    dim: int,
+) -> str:
+    query_expr = f"$2::{vector_type}"
+    column = quote_ident(vector_column)
+    candidate_str = ", ".join(
+        map(quote_ident, dict.fromkeys((*columns, vector_column)))
+    )
+    candidate_order = _quantized_distance(column, query_expr, metric, quantization, dim)
+    where_str, index = _where_clause(where_shape, 3)
+    distance_expr = f"{column} {get_pgvector_operator(metric)} {query_expr}"
+    filter_str = ""
+    if has_max_distance:
+        filter_str = f"WHERE {distance_expr} < ${index} "
+        index += 1
+    select_str = _select_list(columns, _text_columns(vector_column, text_vectors))
+    return (
+        f"SELECT {select_str}, "
+        f"{distance_expr} AS distance "
+        "FROM ("
+        f"SELECT {candidate_str} "
+        f"FROM {quote_ident(table_name)} "
+        f"{f'WHERE {where_str} ' if where_str else ''}"
+        f"ORDER BY {candidate_order} "
+        f"LIMIT ${index}"
+        ") AS c "
+        f"{filter_str}"
+        "ORDER BY distance "
+        "LIMIT $1"
+    )
+
+
+# Text search configuration names are inlined, so an expression index on
+# to_tsvector('config', column) can serve the lexical search.
+_TEXT_CONFIG_PATTERN = re.compile(r"\w+(\.\w+)?", re.ASCII)
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _hybrid_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    id_column: str,
+    vector_column: str,
+    text_column: str,
+    metric: SearchMetric,
+    where_shape: WhereShape,
+    text_vectors: bool,
+    vector_type: str,
+    vector_columns: frozenset[str],
+    text_config: str,
+    text_is_tsvector: bool,
+) -> str:
+    table = quote_ident(table_name)
+    key = quote_ident(id_column)
+    distance_expr = (
+        f"{quote_ident(vector_column)} {get_pgvector_operator(metric)} "
+        f"$2::{vector_type}"
+    )
+    if not _TEXT_CONFIG_PATTERN.fullmatch(text_config):
+        raise ValueError(f"Invalid text search configuration: {text_config!r}")
+    document = (
+        quote_ident(text_column)
+        if text_is_tsvector
+        else f"to_tsvector('{text_config}'::regconfig, {quote_ident(text_column)})"
+    )
+    where_str, index = _where_clause(where_shape, 3)
+    text_param, candidates, semantic_weight, lexical_weight, rrf_k = (
+        f"${i}" for i in range(index, index + 5)
+    )
+    lexical_where = f"{document} @@ q.query"
+    if where_str:
+        lexical_where += f" AND {where_str}"
+    select_str = _select_list(
+        columns, _returned(vector_columns, text_vectors), prefix="t."
+    )
+    return (
+        "WITH semantic AS ("
+        "SELECT key, distance, row_number() OVER (ORDER BY distance) AS rank "
+        f"FROM (SELECT {key} AS key, {distance_expr} AS distance "
+        f"FROM {table} "
+        f"{f'WHERE {where_str} ' if where_str else ''}"
+        f"ORDER BY distance LIMIT {candidates}) AS c"
+        "), lexical AS ("
+        "SELECT key, row_number() OVER (ORDER BY score DESC) AS rank "
+        f"FROM (SELECT {key} AS key, ts_rank_cd({document}, q.query) AS score "
+        f"FROM {table}, "
+        f"websearch_to_tsquery('{text_config}'::regconfig, {text_param}::text) "
+        "AS q(query) "
+        f"WHERE {lexical_where} "
+        f"ORDER BY score DESC LIMIT {candidates}) AS c"
+        ") "
+        f"SELECT {select_str}, s.distance, "
+        "s.rank AS semantic_rank, l.rank AS lexical_rank, "
+        f"COALESCE({semantic_weight}::float8 / ({rrf_k}::int + s.rank), 0) "
+        f"+ COALESCE({lexical_weight}::float8 / ({rrf_k}::int + l.rank), 0) "
+        "AS score "
+        "FROM semantic AS s FULL OUTER JOIN lexical AS l ON l.key = s.key "
+        f"JOIN {table} AS t ON t.{key} = COALESCE(s.key, l.key) "
+        "ORDER BY score DESC "
+        "LIMIT $1"
+    )
+
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _grouped_sql(
+    table_name: str,
+    columns: tuple[str, ...],
+    id_column: str,
+    vector_column: str,
+    group_column: str,
+    metric: SearchMetric,
+    where_shape: WhereShape,
+    has_max_distance: bool,
+    text_vectors: bool,
+    vector_type: str,
+    vector_columns: frozenset[str],
+) -> str:
+    table = quote_ident(table_name)
+    key = quote_ident(id_column)
+    distance_expr = (
+        f"{quote_ident(vector_column)} {get_pgvector_operator(metric)} "
+        f"$2::{vector_type}"
+    )
+    filter_str = _distance_filter(
+        where_shape, distance_expr if has_max_distance else None, 3
+    )
+    index = 3 + sum(1 if size is None else size for _, size, _ in where_shape)
+    index += has_max_distance
+    candidates, per_group = f"${index}", f"${index + 1}"
+    select_str = _select_list(
+        columns, _returned(vector_columns, text_vectors), prefix="t."
+    )
+    return (
+        "WITH candidates AS ("
+        f"SELECT {key} AS key, {quote_ident(group_column)} AS grp, "
+        f"{distance_expr} AS distance "
+        f"FROM {table} "
+        f"{filter_str}"
+        f"ORDER BY distance LIMIT {candidates}"
+        "), ranked AS ("
+        "SELECT key, grp, distance, "
+        "row_number() OVER (PARTITION BY grp ORDER BY distance, key) AS group_rank, "
+        "min(distance) OVER (PARTITION BY grp) AS group_distance "
+        "FROM candidates"
+        "), grouped AS ("
+        "SELECT key, distance, group_rank, "
+        "dense_rank() OVER (ORDER BY group_distance, grp) AS group_index "
+        "FROM ranked "
+        f"WHERE group_rank <= {per_group}::int"
+        ") "
+        f"SELECT {select_str}, g.distance, "
+        f"g.group_index AS {quote_ident(GROUP_INDEX_COLUMN)} "
+        f"FROM grouped AS g JOIN {table} AS t ON t.{key} = g.key "
+        "WHERE g.group_index <= $1 "
+        "ORDER BY g.group_index, g.group_rank"
+    )
+
+
+def clear_statement_cache() -> None:
+    """Drop every compiled statement, e.g. after a schema migration."""
+    for builder in (
+        _insert_sql,
+        _insert_many_sql,
+        _update_sql,
+        _upsert_sql,
+        _find_sql,
+        _delete_sql,
+        _delete_many_sql,
+        _update_many_sql,
+        _update_rows_sql,
+        _nn_sql,
+        _nn_many_sql,
+        _nn_rerank_sql,
+        _hybrid_sql,
+        _grouped_sql,
+    ):
+        builder.cache_clear()
+
+
+def statement_cache_info() -> dict[str, Any]:
+    """Return `functools.lru_cache` statistics for each statement kind."""
+    return {
+        "insert": _insert_sql.cache_info(),
+        "insert_many": _insert_many_sql.cache_info(),
+        "update": _update_sql.cache_info(),
+        "upsert": _upsert_sql.cache_info(),
+        "find": _find_sql.cache_info(),
+        "delete": _delete_sql.cache_info(),
+        "delete_many": _delete_many_sql.cache_info(),
+        "update_many": _update_many_sql.cache_info(),
+        "update_rows": _update_rows_sql.cache_info(),
+        "nn": _nn_sql.cache_info(),
+        "nn_many": _nn_many_sql.cache_info(),
+        "nn_rerank": _nn_rerank_sql.cache_info(),
+        "hybrid": _hybrid_sql.cache_info(),
+        "grouped": _grouped_sql.cache_info(),
+    }
 
 
 class QueryBuilder:
@@ -10,232 +821,530 @@ class QueryBuilder:
     def build_insert_query(
         table_name: str,
         data: dict[str, Any],
-        uuid_columns: set[str] = set(),
-        vector_columns: set[str] = set(),
-    ) -> tuple[sql.SQL, list[Any]]:
-        columns = list(data.keys())
-        values = list(data.values())
-
-        placeholders = []
-        for i, col in enumerate(columns):
-            if col in uuid_columns:
-                placeholders.append(sql.SQL(f"${i+1}::uuid"))
-            else:
-                placeholders.append(sql.SQL(f"${i+1}"))
-
-        columns_str = sql.SQL(", ").join(map(sql.Identifier, columns))
-        values_str = sql.SQL(", ").join(placeholders)
-
-        return_columns_str = sql.SQL(", ").join(
-            [
-                sql.SQL("{}::text").format(sql.Identifier(col))
-                if col in vector_columns
-                else sql.Identifier(col)
-                for col in columns
-            ]
+        uuid_columns: AbstractSet[str] = frozenset(),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+    ) -> tuple[str, list[Any]]:
+        """Build a single-row INSERT returning the inserted row.
+
+        Vector values are bound as `::vector` parameters. With `text_vectors`
+        they are sent and returned as pgvector text, otherwise as float32
+        arrays for an engine with a binary vector codec. Values of
+        `bit_columns` are bit strings such as ``"0110"``.
+        """
+        columns = tuple(data.keys())
+        query = _insert_sql(
+            table_name,
+            columns,
+            frozenset(uuid_columns) & set(columns),
+            frozenset(vector_columns) & set(columns),
+            text_vectors,
+            frozenset(bit_columns) & set(columns),
         )
+        return query, _bind(data, vector_columns, text_vectors)
 
-        query = sql.SQL("""
-            INSERT INTO {table} ({columns})
-            VALUES ({values})
-            RETURNING {return_columns}
-        """).format(
-            table=sql.Identifier(table_name),
-            columns=columns_str,
-            values=values_str,
-            return_columns=return_columns_str,
+    @staticmethod
+    def build_update_query(
+        table_name: str,
+        where: dict[str, Any],
+        data: dict[str, Any],
+        return_columns: Sequence[str] = ("id",),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+        uuid_columns: AbstractSet[str] = frozenset(),
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        query = _update_sql(
+            table_name,
+            tuple(data.keys()),
+            _where_shape(where, column_types),
+            tuple(return_columns),
+            frozenset(uuid_columns) & set(data.keys()),
+            frozenset(vector_columns) & {*data.keys(), *return_columns},
+            text_vectors,
+            frozenset(bit_columns) & set(data.keys()),
         )
+        return query, [
+            *_bind(data, vector_columns, text_vectors),
+            *_where_values(where),
+        ]
 
-        return query, values
+    @staticmethod
+    def build_upsert_query(
+        table_name: str,
+        where: dict[str, Any],
+        data: dict[str, Any],
+        uuid_columns: AbstractSet[str] = frozenset(),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+    ) -> tuple[str, list[Any]]:
+        columns = tuple(data.keys())
+        query = _upsert_sql(
+            table_name,
+            columns,
+            tuple(where.keys()),
+            frozenset(uuid_columns) & set(columns),
+            frozenset(vector_columns) & set(columns),
+            text_vectors,
+            frozenset(bit_columns) & set(columns),
+        )
+        return query, _bind(data, vector_columns, text_vectors)
 
     @staticmethod
-    def build_update_query(
-        table_name: str, where: dict[str, Any], data: dict[str, Any]
-    ) -> tuple[sql.SQL, list[Any]]:
-        set_clauses = []
-        values = []
-        where_clauses = []
-
-        for attr, value in data.items():
-            set_clauses.append(
-                sql.SQL("{} = {}").format(sql.Identifier(attr), sql.Placeholder())
-            )
-            values.append(value)
+    def build_insert_many_query(
+        table_name: str,
+        rows: list[dict[str, Any]],
+        uuid_columns: AbstractSet[str] = frozenset(),
+        vector_columns: AbstractSet[str] = frozenset(),
+        conflict_target: list[str] | None = None,
+        returning: bool = False,
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+    ) -> tuple[str, list[Any]]:
+        """Build one multi-row INSERT (or upsert when `conflict_target` is set).
 
-        for attr, value in where.items():
-            where_clauses.append(
-                sql.SQL("{} = {}").format(sql.Identifier(attr), sql.Placeholder())
+        Every row must provide the same columns as the first one.
+        """
+        if not rows:
+            raise ValueError("At least one row is required")
+        columns = tuple(rows[0].keys())
+        if len(rows) * len(columns) > MAX_QUERY_PARAMETERS:
+            raise ValueError(
+                f"{len(rows)} rows of {len(columns)} columns exceed the "
+                f"{MAX_QUERY_PARAMETERS} parameter limit"
             )
-            values.append(value)
 
-        set_str = sql.SQL(", ").join(set_clauses)
-        where_str = sql.SQL(" AND ").join(where_clauses)
+        values: list[Any] = []
+        for row in rows:
+            if row.keys() != rows[0].keys():
+                raise ValueError("All rows must provide the same columns")
+            values.extend(_bind(row, vector_columns, text_vectors))
 
-        query = sql.SQL("""
-            UPDATE {table}
-            SET {set}
-            WHERE {where}
-            RETURNING id
-        """).format(table=sql.Identifier(table_name), set=set_str, where=where_str)
+        query = _insert_many_sql(
+            table_name,
+            columns,
+            len(rows),
+            tuple(conflict_target) if conflict_target is not None else None,
+            frozenset(uuid_columns) & set(columns),
+            frozenset(vector_columns) & set(columns),
+            text_vectors,
+            returning,
+            frozenset(bit_columns) & set(columns),
+        )
+        return query, values
+
+    @staticmethod
+    def build_find_query(
+        table_name: str,
+        columns: Sequence[str],
+        where: dict[str, Any] = {},
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        order: tuple[tuple[str, str], ...] = (),
+        take: int | None = None,
+        skip: int | None = None,
+        after: Sequence[Any] | None = None,
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a SELECT over the rows matching `where`.
 
+        `order` comes from `normalize_order_by`. `after` holds the `order`
+        column values of the last row of the previous page: only rows past
+        it are returned (keyset pagination). Those values are cast with
+        `column_types` since raw parameters are bound untyped.
+        """
+        if after is not None and len(after) != len(order):
+            raise ValueError("after must provide one value per order column")
+        query = _find_sql(
+            table_name,
+            tuple(columns),
+            _where_shape(where, column_types),
+            frozenset(vector_columns) & set(columns),
+            text_vectors,
+            order,
+            (
+                tuple(column_types.get(col) for col, _ in order)
+                if after is not None
+                else None
+            ),
+            take is not None,
+            skip is not None,
+        )
+        values = _where_values(where)
+        if after is not None:
+            values.extend(after)
+        if take is not None:
+            values.append(take)
+        if skip is not None:
+            values.append(skip)
         return query, values
 
     @staticmethod
-    def build_upsert_query(
+    def build_delete_query(
         table_name: str,
         where: dict[str, Any],
-        data: dict[str, Any],
-        uuid_columns: set[str] = set(),
-        vector_columns: set[str] = set(),
-    ) -> tuple[sql.SQL, list[Any]]:
-        columns = []
-        values = []
-        update_clauses = []
-
-        for attr, value in data.items():
-            columns.append(attr)
-            update_clauses.append(
-                sql.SQL("{} = EXCLUDED.{}").format(
-                    sql.Identifier(attr), sql.Identifier(attr)
-                )
-            )
-            values.append(value)
-
-        columns_str = sql.SQL(", ").join(map(sql.Identifier, columns))
-        conflict_target = sql.SQL(", ").join(map(sql.Identifier, where.keys()))
-        placeholders = []
-        for i, col in enumerate(columns):
-            if col in uuid_columns:
-                placeholders.append(sql.SQL(f"${i+1}::uuid"))
-            else:
-                placeholders.append(sql.SQL(f"${i+1}"))
-        values_str = sql.SQL(", ").join(placeholders)
-
-        return_columns_str = sql.SQL(", ").join(
-            [
-                sql.SQL("{}::text").format(sql.Identifier(col))
-                if col in vector_columns
-                else sql.Identifier(col)
-                for col in columns
-            ]
+        return_columns: Sequence[str] = (),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        if not where:
+            raise ValueError("A delete needs a where clause")
+        query = _delete_sql(
+            table_name,
+            _where_shape(where, column_types),
+            tuple(return_columns),
+            frozenset(vector_columns) & set(return_columns),
+            text_vectors,
         )
+        return query, _where_values(where)
 
-        query = sql.SQL("""
-            INSERT INTO {table} ({columns})
-            VALUES ({values})
-            ON CONFLICT ({conflict_target})
-            DO UPDATE SET {update}
-            RETURNING {return_columns}
-        """).format(
-            table=sql.Identifier(table_name),
-            columns=columns_str,
-            values=values_str,
-            conflict_target=conflict_target,
-            update=sql.SQL(", ").join(update_clauses),
-            return_columns=return_columns_str,
+    @staticmethod
+    def build_delete_many_query(
+        table_name: str,
+        where: dict[str, Any],
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a DELETE of every row matching `where`.
+
+        List values match with ``= ANY`` against one array parameter, typed
+        from `column_types`.
+        """
+        query = _delete_many_sql(
+            table_name,
+            _match_shape(where),
+            tuple(column_types.get(col) for col in where),
         )
+        return query, [_list_param(value) for value in where.values()]
 
+    @staticmethod
+    def build_update_many_query(
+        table_name: str,
+        where: dict[str, Any],
+        data: dict[str, Any],
+        uuid_columns: AbstractSet[str] = frozenset(),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build an UPDATE setting `data` on every row matching `where`."""
+        if not data:
+            raise ValueError("Nothing to update")
+        query = _update_many_sql(
+            table_name,
+            tuple(data),
+            _match_shape(where),
+            tuple(column_types.get(col) for col in where),
+            frozenset(uuid_columns) & set(data),
+            frozenset(vector_columns) & set(data),
+            frozenset(bit_columns) & set(data),
+        )
+        values = _bind(data, vector_columns, text_vectors)
+        values.extend(_list_param(value) for value in where.values())
         return query, values
 
     @staticmethod
-    def build_find_query(
+    def build_update_rows_query(
         table_name: str,
-        columns: list[str],
+        rows: list[dict[str, Any]],
+        key_columns: Sequence[str],
         where: dict[str, Any] = {},
-        vector_columns: set[str] = set(),
-    ) -> tuple[sql.SQL, list[Any]]:
-        where_clauses = []
-        values = []
-        if where:
-            for i, (attr, value) in enumerate(where.items()):
-                if isinstance(value, list):
-                    value_str = ", ".join(f"${j+1}" for j in range(i, i + len(value)))
-                    where_clauses.append(
-                        sql.SQL("{} IN ({})").format(
-                            sql.Identifier(attr), sql.SQL(value_str)
-                        )
-                    )
-                    values.extend(value)
-                else:
-                    where_clauses.append(
-                        sql.SQL("{} = ${}").format(
-                            sql.Identifier(attr), sql.SQL(str(i + 1))
-                        )
-                    )
-                    values.append(value)
-
-        columns_str = sql.SQL(", ").join(
-            [
-                sql.SQL("{}::text").format(sql.Identifier(col))
-                if col in vector_columns
-                else sql.Identifier(col)
-                for col in columns
-            ]
-        )
+        uuid_columns: AbstractSet[str] = frozenset(),
+        vector_columns: AbstractSet[str] = frozenset(),
+        text_vectors: bool = True,
+        bit_columns: AbstractSet[str] = frozenset(),
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build one UPDATE ... FROM (VALUES ...) giving each row its own values.
+
+        Every row must provide the `key_columns`, which find the row to update,
+        and the same other columns as the first row. `where` further limits
+        the rows updated.
+        """
+        if not rows:
+            raise ValueError("At least one row is required")
+        columns = tuple(rows[0].keys())
+        missing = [col for col in key_columns if col not in columns]
+        if missing:
+            raise ValueError(f"Every row must provide {', '.join(missing)}")
+        if len(columns) == len(key_columns):
+            raise ValueError("Nothing to update")
+        if len(rows) * len(columns) + len(where) > MAX_QUERY_PARAMETERS:
+            raise ValueError(
+                f"{len(rows)} rows of {len(columns)} columns exceed the "
+                f"{MAX_QUERY_PARAMETERS} parameter limit"
+            )
+
+        values: list[Any] = []
+        for row in rows:
+            if row.keys() != rows[0].keys():
+                raise ValueError("All rows must provide the same columns")
+            values.extend(_bind(row, vector_columns, text_vectors))
+        values.extend(_list_param(value) for value in where.values())
 
-        where_str = sql.SQL(" AND ").join(where_clauses)
-        query = sql.SQL("SELECT {columns} FROM {table}").format(
-            columns=columns_str, table=sql.Identifier(table_name)
+        column_casts = tuple(
+            "uuid"
+            if col in uuid_columns
+            else "vector"
+            if col in vector_columns
+            else "varbit"
+            if col in bit_columns
+            else column_types.get(col)
+            for col in columns
+        )
+        query = _update_rows_sql(
+            table_name,
+            columns,
+            tuple(key_columns),
+            len(rows),
+            column_casts,
+            _match_shape(where),
+            tuple(column_types.get(col) for col in where),
         )
-        if where_clauses:
-            query += sql.SQL(" WHERE {where}").format(where=where_str)
         return query, values
 
     @staticmethod
-    def build_delete_query(
-        table_name: str, where: dict[str, Any]
-    ) -> tuple[sql.SQL, list[Any]]:
-        where_clauses = []
-        values = []
-        for i, (attr, value) in enumerate(where.items()):
-            if isinstance(value, list):
-                value_str = ", ".join("%s" for _ in value)
-                where_clauses.append(
-                    sql.SQL("{} IN ({})").format(
-                        sql.Identifier(attr), sql.SQL(value_str)
-                    )
-                )
-                values.extend(value)
-            else:
-                where_clauses.append(sql.SQL("{} = %s").format(sql.Identifier(attr)))
-                values.append(value)
+    def build_nn_query(
+        table_name: str,
+        columns: Sequence[str],
+        query_vec: codec.VectorLike,
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        where: dict[str, Any] = {},
+        max_distance: float | None = None,
+        text_vectors: bool = True,
+        vector_type: str = "vector",
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a top-k search over the rows matching `where`.
 
-        where_str = sql.SQL(" AND ").join(where_clauses)
-        query = sql.SQL("DELETE FROM {table} WHERE {where}").format(
-            table=sql.Identifier(table_name), where=where_str
+        `max_distance` drops rows whose distance is not below the threshold.
+        Both filters are part of the statement, so LIMIT applies to the
+        filtered set. The query vector is bound as a `$2::vector` parameter,
+        so the statement text only depends on the query's shape.
+        """
+        validate_query_vector(query_vec, metric)
+        query = _nn_sql(
+            table_name,
+            tuple(columns),
+            vector_column,
+            metric,
+            _where_shape(where, column_types),
+            max_distance is not None,
+            text_vectors,
+            vector_type,
         )
+        values = [top_k, _bind_vector(query_vec, text_vectors), *_where_values(where)]
+        if max_distance is not None:
+            values.append(max_distance)
+        return query, values
 
+    @staticmethod
+    def build_nn_rerank_query(
+        table_name: str,
+        columns: Sequence[str],
+        query_vec: codec.VectorLike,
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        candidates: int,
+        quantization: Quantization,
+        dim: int,
+        where: dict[str, Any] = {},
+        max_distance: float | None = None,
+        text_vectors: bool = True,
+        vector_type: str = "vector",
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a two-stage top-k search in one statement.
+
+        The inner query takes `candidates` rows ordered by the quantized
+        distance, which an index on `quantized_expression` serves; the outer
+        query reranks them by the exact distance. `max_distance` applies to
+        the exact distance.
+        """
+        validate_query_vector(query_vec, metric)
+        if candidates < top_k:
+            raise ValueError("candidates must be at least top_k")
+        query = _nn_rerank_sql(
+            table_name,
+            tuple(columns),
+            vector_column,
+            metric,
+            _where_shape(where, column_types),
+            max_distance is not None,
+            text_vectors,
+            vector_type,
+            Quantization(quantization),
+            dim,
+        )
+        values = [top_k, _bind_vector(query_vec, text_vectors), *_where_values(where)]
+        if max_distance is not None:
+            values.append(max_distance)
+        values.append(candidates)
         return query, values
 
     @staticmethod
-    def build_nn_query(
+    def build_hybrid_query(
         table_name: str,
-        columns: list[str],
-        query_vec: list[float],
+        columns: Sequence[str],
+        id_column: str,
+        query_vec: codec.VectorLike,
         vector_column: str,
+        text_query: str,
+        text_column: str,
         top_k: int,
         metric: SearchMetric,
-    ) -> tuple[sql.SQL, list[Any]]:
-        vector_op = get_pgvector_operation(vector_column, query_vec, metric)
-
-        columns_str = sql.SQL(", ").join(
-            [
-                sql.SQL("{}::text").format(sql.Identifier(col))
-                if col == vector_column
-                else sql.Identifier(col)
-                for col in columns
-            ]
+        weights: tuple[float, float] = (1.0, 1.0),
+        fusion: Fusion = Fusion.RRF,
+        candidates: int | None = None,
+        rrf_k: int = DEFAULT_RRF_K,
+        where: dict[str, Any] = {},
+        text_config: str = "simple",
+        text_is_tsvector: bool = False,
+        text_vectors: bool = True,
+        vector_type: str = "vector",
+        vector_columns: AbstractSet[str] = frozenset(),
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a vector + full-text search fused by reciprocal rank, in one statement.
+
+        Each search takes its best `candidates` rows (default ``4 * top_k``)
+        in a CTE; a row's score is the sum over the searches that found it of
+        ``weight / (rrf_k + rank)``, with `weights` given as (vector, text).
+        Rows carry ``score``, ``distance`` and the 1-based ``semantic_rank``
+        and ``lexical_rank``, which are NULL for searches that missed the row.
+        `text_column` is matched with ``websearch_to_tsquery`` using
+        `text_config`, or directly when it is a tsvector column.
+        """
+        validate_query_vector(query_vec, metric)
+        if Fusion(fusion) != Fusion.RRF:
+            raise ValueError(f"Unsupported fusion: {fusion!r}")
+        candidates = 4 * top_k if candidates is None else candidates
+        if candidates < top_k:
+            raise ValueError("candidates must be at least top_k")
+        semantic_weight, lexical_weight = weights
+        query = _hybrid_sql(
+            table_name,
+            tuple(columns),
+            id_column,
+            vector_column,
+            text_column,
+            metric,
+            _where_shape(where, column_types),
+            text_vectors,
+            vector_type,
+            frozenset(vector_columns),
+            text_config,
+            text_is_tsvector,
         )
+        values = [
+            top_k,
+            _bind_vector(query_vec, text_vectors),
+            *_where_values(where),
+            text_query,
+            candidates,
+            float(semantic_weight),
+            float(lexical_weight),
+            rrf_k,
+        ]
+        return query, values
 
-        query = sql.SQL("""
-            SELECT {columns}, {vector_op} AS distance
-            FROM {table}
-            ORDER BY distance
-            LIMIT $1;
-        """).format(
-            columns=columns_str,
-            vector_op=sql.SQL(vector_op),
-            table=sql.Identifier(table_name),
+    @staticmethod
+    def build_grouped_query(
+        table_name: str,
+        columns: Sequence[str],
+        id_column: str,
+        query_vec: codec.VectorLike,
+        vector_column: str,
+        group_column: str,
+        top_groups: int,
+        metric: SearchMetric,
+        per_group: int = 1,
+        candidates: int | None = None,
+        where: dict[str, Any] = {},
+        max_distance: float | None = None,
+        text_vectors: bool = True,
+        vector_type: str = "vector",
+        vector_columns: AbstractSet[str] = frozenset(),
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build a search for the best `per_group` rows of the `top_groups` best groups.
+
+        Groups are the distinct values of `group_column`, ranked by their
+        closest row. Grouping runs over the `candidates` nearest rows (default
+        ``DEFAULT_GROUP_CANDIDATES_FACTOR * top_groups * per_group``), taken
+        with the same ORDER BY distance LIMIT an index serves, so fewer groups
+        come back when the candidates span fewer. Only the selected rows are
+        joined back for `columns`.
+        """
+        validate_query_vector(query_vec, metric)
+        if top_groups < 1 or per_group < 1:
+            raise ValueError("top_groups and per_group must be positive")
+        if candidates is None:
+            candidates = DEFAULT_GROUP_CANDIDATES_FACTOR * top_groups * per_group
+        if candidates < top_groups:
+            raise ValueError("candidates must be at least top_groups")
+        query = _grouped_sql(
+            table_name,
+            tuple(columns),
+            id_column,
+            vector_column,
+            group_column,
+            metric,
+            _where_shape(where, column_types),
+            max_distance is not None,
+            text_vectors,
+            vector_type,
+            frozenset(vector_columns),
         )
+        values = [
+            top_groups,
+            _bind_vector(query_vec, text_vectors),
+            *_where_values(where),
+        ]
+        if max_distance is not None:
+            values.append(max_distance)
+        values.extend((candidates, per_group))
+        return query, values
 
-        return query, [top_k]
+    @staticmethod
+    def build_nn_many_query(
+        table_name: str,
+        columns: Sequence[str],
+        query_vecs: Sequence[codec.VectorLike] | codec.FloatArray,
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        where: dict[str, Any] = {},
+        max_distance: float | None = None,
+        text_vectors: bool = True,
+        vector_type: str = "vector",
+        column_types: Mapping[str, str] = {},
+    ) -> tuple[str, list[Any]]:
+        """Build one statement running a top-k search for every query vector.
+
+        Rows carry `QUERY_INDEX_COLUMN`, the 1-based position of their query
+        vector, and are ordered by it and then by distance.
+        """
+        for query_vec in query_vecs:
+            validate_query_vector(query_vec, metric)
+        query = _nn_many_sql(
+            table_name,
+            tuple(columns),
+            vector_column,
+            metric,
+            _where_shape(where, column_types),
+            max_distance is not None,
+            text_vectors,
+            vector_type,
+        )
+        values = [codec.encode_text_array(query_vecs), top_k, *_where_values(where)]
+        if max_distance is not None:
+            values.append(max_distance)
+        return query, values
@@ -0,0 +1,160 @@
+"""Array-shaped results for callers that keep embeddings in NumPy.
+
+The actions return pydantic models by default. With ``as_arrays=True`` they
+return a `VectorBatch` instead: one ``(n, dim)`` float32 matrix for the
+vector column and parallel 1-D arrays for the ids and distances, without
+building a Python list per vector.
+
+`hybrid_search` returns a `HybridResult` per row: the row with its fused
+score and its rank in each of the searches.
+
+Reads that fetch only some columns (``select=...``) are parsed into a
+`partial_model` holding just those fields.
+
+With ``as_records=True`` (trusted-data mode) rows skip pydantic entirely:
+`to_records` turns the engine's rows into namedtuples of a `record_type`,
+with vector columns as float32 arrays, in one pass and without validation.
+"""
+
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AbstractSet, Any, Generic, NamedTuple, Optional, Sequence, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, create_model
+
+from . import codec
+
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class VectorBatch:
+    """Row `i` of `vectors` (and `distances[i]`, if any) belongs to `ids[i]`."""
+
+    ids: npt.NDArray[Any]
+    vectors: codec.FloatArray
+    distances: Optional[codec.FloatArray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Sequence[dict[str, Any]],
+        id_column: str,
+        vector_column: str,
+        with_distance: bool = False,
+    ) -> "VectorBatch":
+        return cls(
+            ids=np.array([row[id_column] for row in rows]),
+            vectors=codec.decode_matrix([row[vector_column] for row in rows]),
+            distances=(
+                np.fromiter(
+                    (row["distance"] for row in rows),
+                    dtype=np.float32,
+                    count=len(rows),
+                )
+                if with_distance
+                else None
+            ),
+        )
+
+    def split(self, groups: npt.NDArray[np.int64], count: int) -> list["VectorBatch"]:
+        """Split into `count` batches by the sorted group index of each row."""
+        bounds = np.searchsorted(groups, np.arange(count + 1))
+        return [
+            VectorBatch(
+                ids=self.ids[start:end],
+                vectors=self.vectors[start:end],
+                distances=(
+                    self.distances[start:end] if self.distances is not None else None
+                ),
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+
+@dataclass(frozen=True)
+class HybridResult(Generic[_T]):
+    """A row found by `hybrid_search`, with how each search ranked it.
+
+    `distance` and `semantic_rank` are None when the vector search did not
+    return the row, `lexical_rank` when the full-text search did not.
+    """
+
+    item: _T
+    score: float
+    distance: Optional[float]
+    semantic_rank: Optional[int]
+    lexical_rank: Optional[int]
+
+
+@dataclass(frozen=True)
+class VectorGroup(Generic[_T]):
+    """The best rows of one group found by `retrieve_grouped`, closest first."""
+
+    key: Any
+    distance: float
+    """Distance of the group's closest row."""
+    items: list[_T]
+
+
+@lru_cache(maxsize=256)
+def partial_model(model: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """A model with only the `fields` of `model`, for rows read with a projection.
+
+    Field types and validation are those of `model`; columns the model does
+    not declare (e.g. ``distance`` on a plain model) are typed as floats.
+    """
+    definitions: dict[str, Any] = {}
+    for name in fields:
+        field = model.model_fields.get(name)
+        definitions[name] = (float, ...) if field is None else (field.annotation, field)
+    return create_model(
+        f"{model.__name__}Partial",
+        __config__=model.model_config,
+        __module__=model.__module__,
+        **definitions,
+    )
+
+
+@lru_cache(maxsize=256)
+def record_type(name: str, fields: tuple[str, ...]) -> type[NamedTuple]:
+    """A namedtuple class with `fields`, shared by every read of that shape."""
+    return namedtuple(name, fields)  # type: ignore[return-value]
+
+
+def _decode_column(values: list[Any]) -> list[Any]:
+    if any(value is None for value in values):
+        return [
+            None
+            if value is None
+            else (codec.decode_text(value) if isinstance(value, str) else value)
+            for value in values
+        ]
+    return list(codec.decode_matrix(values))
+
+
+def to_records(
+    rows: Sequence[dict[str, Any]],
+    record: type[NamedTuple],
+    vector_columns: AbstractSet[str] = frozenset(),
+) -> list[Any]:
+    """Build a `record` per row, decoding `vector_columns` into float32 arrays.
+
+    Values are taken as the engine returned them; nothing is validated, so
+    this is only for rows read from a schema the caller trusts.
+    """
+    if not rows:
+        return []
+    columns = [
+        _decode_column([row[field] for row in rows])
+        if field in vector_columns
+        else [row[field] for row in rows]
+        for field in record._fields
+    ]
+    return list(map(record._make, zip(*columns)))
@@ -0,0 +1,106 @@
+"""Opt-in coalescing of identical concurrent nearest neighbor searches.
+
+When several tasks run the same search (same table, statement, parameters
+and float16-quantized query vector, see `NNCache.make_key`) while the first
+one is still waiting for the database, the later ones await that result
+instead of running their own ANN search. A follower waits at most
+`max_wait` seconds before it gives up and runs the search itself.
+
+Searches inside a transaction are never coalesced, and a write to a table
+through the same client stops later searches from joining the searches on
+that table already in flight.
+
+Enable it with ``VectorPrisma(single_flight=True)`` or pass a `SingleFlight`.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Union
+
+DEFAULT_MAX_WAIT = 1.0
+
+Rows = list[dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class SingleFlightStats:
+    leaders: int
+    """Searches that ran against the database."""
+    coalesced: int
+    """Searches answered by an identical search already in flight."""
+    timeouts: int
+    """Followers that stopped waiting after `max_wait` and searched themselves."""
+    in_flight: int
+
+
+class SingleFlight:
+    """Tracks in-flight searches by key so identical ones can share a result."""
+
+    def __init__(self, max_wait: Union[float, timedelta] = DEFAULT_MAX_WAIT) -> None:
+        if isinstance(max_wait, timedelta):
+            max_wait = max_wait.total_seconds()
+        if max_wait <= 0:
+            raise ValueError("max_wait must be positive")
+        self.max_wait = max_wait
+        self._calls: dict[bytes, tuple[str, "asyncio.Future[Rows]"]] = {}
+        self._leaders = 0
+        self._coalesced = 0
+        self._timeouts = 0
+
+    async def run(
+        self, key: bytes, table_name: str, search: Callable[[], Awaitable[Rows]]
+    ) -> tuple[Rows, bool]:
+        """Run `search` or join the identical one in flight.
+
+        Returns the rows, which the caller may modify, and whether they came
+        from another caller's search.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            try:
+                rows = await asyncio.wait_for(asyncio.shield(call[1]), self.max_wait)
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+            except asyncio.CancelledError:
+                # if the leader was cancelled rather than us, search on our own
+                if not call[1].cancelled():
+                    raise
+            else:
+                self._coalesced += 1
+                return [dict(row) for row in rows], True
+            return await search(), False
+
+        future: "asyncio.Future[Rows]" = asyncio.get_running_loop().create_future()
+        # followers may all have timed out, don't warn about an unread error
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._calls[key] = (table_name, future)
+        self._leaders += 1
+        try:
+            rows = await search()
+        except BaseException as err:
+            if isinstance(err, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(err)
+            raise
+        else:
+            future.set_result(rows)
+            return [dict(row) for row in rows], False
+        finally:
+            if self._calls.get(key, (None, None))[1] is future:
+                del self._calls[key]
+
+    def forget(self, table_name: str) -> None:
+        """Let no later search join the in-flight searches on `table_name`."""
+        stale = [key for key, call in self._calls.items() if call[0] == table_name]
+        for key in stale:
+            del self._calls[key]
+
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(
+            leaders=self._leaders,
+            coalesced=self._coalesced,
+            timeouts=self._timeouts,
+            in_flight=len(self._calls),
+        )
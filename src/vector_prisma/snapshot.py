@@ -0,0 +1,531 @@
+"""Exact nearest neighbor search over a local, memory-mapped vector snapshot.
+
+A snapshot is a directory holding one model's vector column as a raw
+float32 matrix (``vectors.f32``), the row norms (``norms.f32``), the ids
+(``ids.npy``) and ``meta.json``. It is exported through the generated
+actions and searched in process as a blocked matrix product with a top-k
+partial sort, which for a hot subset of a few hundred thousand rows beats a
+network round trip and an ANN index traversal.
+
+The matrix is opened with ``mmap``, so every worker process opening the same
+snapshot shares one copy in the page cache; a pickled `VectorSnapshot`
+reopens the mapping instead of copying the data.
+
+With a `changed_column` (e.g. an ``@updatedAt`` field), `refresh` fetches
+only the rows changed since the last export or refresh, overwriting changed
+rows and appending new ones. Deleted rows are not noticed; export again to
+drop them.
+
+Every file is written to a temporary file next to it and renamed into place,
+``meta.json`` last, so a crash never leaves a torn file and a reader never
+maps a file while it is rewritten.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Optional, Protocol, Sequence, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from . import codec
+from .operations import SearchMetric, validate_query_vector
+from .results import VectorBatch
+
+# Rows scored per matrix product; bounds the temporary (block, queries) array.
+DEFAULT_BLOCK_SIZE = 65536
+
+DEFAULT_EXPORT_BATCH_SIZE = 10000
+
+_L1_CHUNK_SIZE = 1024
+
+_VECTORS = "vectors.f32"
+_NORMS = "norms.f32"
+_IDS = "ids.npy"
+_META = "meta.json"
+
+
+class _SnapshotSource(Protocol):
+    """The generated actions of a model, as used by the snapshot."""
+
+    _meta: Any
+
+    def find_iter(self, where: Any = None, **kwargs: Any) -> Any: ...
+
+    async def find_many(self, where: Any = None, **kwargs: Any) -> Any: ...
+
+
+class VectorSnapshot:
+    """A read-only, memory-mapped copy of one vector column and its ids."""
+
+    def __init__(self, path: Union[str, os.PathLike[str]]) -> None:
+        self.path = Path(path)
+        self._load()
+
+    def _load(self) -> None:
+        with open(self.path / _META, encoding="utf-8") as f:
+            self.meta: dict[str, Any] = json.load(f)
+        count, dim = self.meta["count"], self.meta["dim"]
+        if count:
+            self.vectors: codec.FloatArray = np.memmap(
+                self.path / _VECTORS, dtype=np.float32, mode="r", shape=(count, dim)
+            )
+            self.norms: codec.FloatArray = np.memmap(
+                self.path / _NORMS, dtype=np.float32, mode="r", shape=(count,)
+            )
+        else:
+            self.vectors = np.empty((0, dim), dtype=np.float32)
+            self.norms = np.empty(0, dtype=np.float32)
+        self.ids: npt.NDArray[Any] = np.load(self.path / _IDS, allow_pickle=False)
+        self._positions: Optional[dict[Any, int]] = None
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (VectorSnapshot, (self.path,))
+
+    @property
+    def vector_column(self) -> str:
+        return self.meta["vector_column"]
+
+    def reload(self) -> bool:
+        """Pick up a refresh made by another process; True if there was one."""
+        with open(self.path / _META, encoding="utf-8") as f:
+            version = json.load(f)["version"]
+        if version == self.meta["version"]:
+            return False
+        self._load()
+        return True
+
+    @classmethod
+    async def export(
+        cls,
+        actions: _SnapshotSource,
+        path: Union[str, os.PathLike[str]],
+        vector_column: Optional[str] = None,
+        *,
+        changed_column: Optional[str] = None,
+        where: Any = None,
+        batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+    ) -> "VectorSnapshot":
+        """Write the ids and `vector_column` of the rows matching `where`.
+
+        `vector_column` defaults to the model's first vector column. Give
+        `changed_column` to enable `refresh`; it must not be NULL and must
+        grow whenever a row is written.
+        """
+        meta = actions._meta
+        vector_column = vector_column or next(iter(meta.VECTOR_TYPES))
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        # taken first, so rows written during the export are fetched again by
+        # the next refresh rather than missed
+        watermark = await _watermark(actions, changed_column, where)
+
+        ids: list[npt.NDArray[Any]] = []
+        count = 0
+        with (
+            open(_tmp(path, _VECTORS), "wb") as vectors,
+            open(_tmp(path, _NORMS), "wb") as norms,
+        ):
+            async for batch in actions.find_iter(
+                where,
+                batch_size=batch_size,
+                select=[vector_column],
+                as_arrays=True,
+            ):
+                matrix = np.ascontiguousarray(batch.vectors, dtype=np.float32)
+                vectors.write(matrix.tobytes())
+                norms.write(np.linalg.norm(matrix, axis=1).astype(np.float32).tobytes())
+                ids.append(_concat_ids([batch.ids]))
+                count += len(batch)
+
+        _save_ids(path, _concat_ids(ids))
+        _replace(path, _VECTORS)
+        _replace(path, _NORMS)
+        _write_meta(
+            path,
+            {
+                "version": 1,
+                "table_name": meta.TABLE_NAME,
+                "id_column": meta.ID_COLUMN,
+                "vector_column": vector_column,
+                "dim": meta.VECTOR_DIMS[vector_column],
+                "count": count,
+                "changed_column": changed_column,
+                "watermark": watermark,
+                "where": dict(where) if where else None,
+            },
+        )
+        return cls(path)
+
+    async def refresh(
+        self,
+        actions: _SnapshotSource,
+        *,
+        batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+    ) -> int:
+        """Apply the rows changed since the last export or refresh.
+
+        The files are copied, updated and renamed into place, so readers
+        keep the data they mapped until their next `reload`. Returns the
+        number of rows fetched.
+        """
+        changed_column = self.meta["changed_column"]
+        if changed_column is None:
+            raise ValueError("The snapshot was exported without a changed_column")
+        where = self.meta["where"]
+        watermark = await _watermark(actions, changed_column, where)
+        if watermark is None or watermark == self.meta["watermark"]:
+            return 0
+
+        if self._positions is None:
+            self._positions = {key: i for i, key in enumerate(self.ids.tolist())}
+        # kept apart until the files are in place, in case the refresh fails
+        positions = dict(self._positions)
+        count, dim = len(self), self.meta["dim"]
+        updates: Optional[np.memmap] = None
+        norm_updates: Optional[np.memmap] = None
+        new_ids: list[npt.NDArray[Any]] = []
+        fetched = 0
+        vectors_tmp, norms_tmp = _tmp(self.path, _VECTORS), _tmp(self.path, _NORMS)
+        shutil.copyfile(self.path / _VECTORS, vectors_tmp)
+        shutil.copyfile(self.path / _NORMS, norms_tmp)
+        with open(vectors_tmp, "ab") as vectors, open(norms_tmp, "ab") as norms:
+            async for batch in actions.find_iter(
+                where,
+                batch_size=batch_size,
+                order_by={changed_column: "asc"},
+                select=[self.vector_column],
+                after=self.meta["watermark"],
+                as_arrays=True,
+            ):
+                fetched += len(batch)
+                batch_ids = _concat_ids([batch.ids])
+                matrix = np.ascontiguousarray(batch.vectors, dtype=np.float32)
+                row_norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+                existing = np.fromiter(
+                    (key in positions for key in batch_ids.tolist()),
+                    dtype=bool,
+                    count=len(batch),
+                )
+                if existing.any():
+                    if updates is None:
+                        updates = np.memmap(
+                            vectors_tmp,
+                            dtype=np.float32,
+                            mode="r+",
+                            shape=(count, dim),
+                        )
+                        norm_updates = np.memmap(
+                            norms_tmp,
+                            dtype=np.float32,
+                            mode="r+",
+                            shape=(count,),
+                        )
+                    rows = [positions[key] for key in batch_ids[existing].tolist()]
+                    updates[rows] = matrix[existing]
+                    norm_updates[rows] = row_norms[existing]  # type: ignore[index]
+                added = batch_ids[~existing]
+                for key in added.tolist():
+                    positions[key] = len(positions)
+                new_ids.append(added)
+                vectors.write(matrix[~existing].tobytes())
+                norms.write(row_norms[~existing].tobytes())
+
+        if updates is not None:
+            updates.flush()
+            norm_updates.flush()  # type: ignore[union-attr]
+            # unmap before the rename, which Windows requires
+            del updates, norm_updates
+        added_count = sum(map(len, new_ids))
+        if added_count:
+            _save_ids(self.path, _concat_ids([self.ids, *new_ids]))
+        _replace(self.path, _VECTORS)
+        _replace(self.path, _NORMS)
+        _write_meta(
+            self.path,
+            {
+                **self.meta,
+                "version": self.meta["version"] + 1,
+                "count": count + added_count,
+                "watermark": watermark,
+            },
+        )
+        self._load()
+        self._positions = positions
+        return fetched
+
+    def search(
+        self,
+        query_vecs: Union[Sequence[codec.VectorLike], codec.FloatArray],
+        top_k: int,
+        metric: SearchMetric,
+        *,
+        max_distance: Optional[float] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> list[tuple[npt.NDArray[np.int64], codec.FloatArray]]:
+        """Exact top-k search for each query vector.
+
+        Returns, per query, the row positions and distances of its nearest
+        rows, nearest first. Distances match pgvector's operators, so
+        INNER_PRODUCT is the negated inner product.
+        """
+        metric = SearchMetric(metric)
+        queries = np.asarray(query_vecs, dtype=np.float32)
+        if queries.ndim != 2 or queries.shape[1] != self.meta["dim"]:
+            raise ValueError(
+                f"Expected query vectors of dimension {self.meta['dim']}, "
+                f"got shape {queries.shape}"
+            )
+        for query_vec in queries:
+            validate_query_vector(query_vec, metric)
+        # the best rows so far, as (queries, <= top_k) position / distance arrays
+        best_positions = np.empty((len(queries), 0), dtype=np.int64)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self), block_size):
+            distances = pairwise_distances(
+                self.vectors[start : start + block_size],
+                self.norms[start : start + block_size],
+                queries,
+                metric,
+            ).T
+            if max_distance is not None:
+                distances[distances >= max_distance] = np.inf
+            positions = _top_k(distances, top_k)
+            best_positions, best_distances = _top_k_merge(
+                (best_positions, best_distances),
+                (positions + start, np.take_along_axis(distances, positions, 1)),
+                top_k,
+            )
+        order = np.argsort(best_distances, axis=1, kind="stable")
+        best_positions = np.take_along_axis(best_positions, order, 1)
+        best_distances = np.take_along_axis(best_distances, order, 1)
+        results = []
+        for positions, distances in zip(best_positions, best_distances):
+            keep = np.isfinite(distances)
+            results.append((positions[keep], distances[keep]))
+        return results
+
+    def retrieve_sync(
+        self,
+        query_vec: codec.VectorLike,
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        *,
+        where: Any = None,
+        max_distance: Optional[float] = None,
+        as_arrays: bool = False,
+    ) -> Union[list[tuple[Any, float]], VectorBatch]:
+        """`retrieve` without leaving the calling thread."""
+        self._check_search(vector_column, where)
+        positions, distances = self.search(
+            [codec.as_vector(query_vec)], top_k, metric, max_distance=max_distance
+        )[0]
+        return self._results(positions, distances, as_arrays)
+
+    async def retrieve(
+        self,
+        query_vec: codec.VectorLike,
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        *,
+        where: Any = None,
+        max_distance: Optional[float] = None,
+        iterative_scan: Any = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: Optional[bool] = None,
+        as_arrays: bool = False,
+    ) -> Union[list[tuple[Any, float]], VectorBatch]:
+        """Drop-in for the generated `retrieve`, answered from the snapshot.
+
+        The search is always exact, so the index options are ignored, and
+        `where` filters are not supported. Results are ``(id, distance)``
+        tuples as with ``ids_only=True``, or a `VectorBatch`. NumPy releases
+        the GIL, so the search runs in a worker thread.
+        """
+        return await asyncio.to_thread(
+            self.retrieve_sync,
+            query_vec,
+            vector_column,
+            top_k,
+            metric,
+            where=where,
+            max_distance=max_distance,
+            as_arrays=as_arrays,
+        )
+
+    async def retrieve_many(
+        self,
+        query_vecs: Union[Sequence[codec.VectorLike], codec.FloatArray],
+        vector_column: str,
+        top_k: int,
+        metric: SearchMetric,
+        *,
+        where: Any = None,
+        max_distance: Optional[float] = None,
+        iterative_scan: Any = None,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        exact: Optional[bool] = None,
+        as_arrays: bool = False,
+    ) -> Union[list[list[tuple[Any, float]]], list[VectorBatch]]:
+        """Batched `retrieve`: every block of rows is scored against all queries."""
+        self._check_search(vector_column, where)
+        if len(query_vecs) == 0:
+            return []
+        found = await asyncio.to_thread(
+            self.search, query_vecs, top_k, metric, max_distance=max_distance
+        )
+        results: list[Any] = [
+            self._results(positions, distances, as_arrays)
+            for positions, distances in found
+        ]
+        return results
+
+    def _check_search(self, vector_column: str, where: Any) -> None:
+        if vector_column != self.vector_column:
+            raise ValueError(
+                f"The snapshot holds {self.vector_column!r}, not {vector_column!r}"
+            )
+        if where:
+            raise ValueError("Snapshot searches do not support where filters")
+
+    def _results(
+        self,
+        positions: npt.NDArray[np.int64],
+        distances: codec.FloatArray,
+        as_arrays: bool,
+    ) -> Union[list[tuple[Any, float]], VectorBatch]:
+        if as_arrays:
+            return VectorBatch(
+                ids=self.ids[positions],
+                vectors=np.asarray(self.vectors[positions]),
+                distances=distances,
+            )
+        return list(zip(self.ids[positions].tolist(), distances.tolist()))
+
+
+async def _watermark(
+    actions: _SnapshotSource, changed_column: Optional[str], where: Any
+) -> Optional[list[Any]]:
+    """Key of the last row in (changed_column, id) order, as find_iter's `after`."""
+    if changed_column is None:
+        return None
+    id_column = actions._meta.ID_COLUMN
+    rows = await actions.find_many(
+        where,
+        take=1,
+        order_by=[{changed_column: "desc"}, {id_column: "desc"}],
+        select=[changed_column],
+        include_vectors=False,
+    )
+    if not rows:
+        return None
+    return [
+        _json_value(getattr(rows[0], changed_column)),
+        _json_value(getattr(rows[0], id_column)),
+    ]
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _concat_ids(ids: list[npt.NDArray[Any]]) -> npt.NDArray[Any]:
+    """One id array; uuids and other objects are stored as strings."""
+    merged = np.concatenate(ids) if ids else np.empty(0, dtype=str)
+    if merged.dtype == object:
+        merged = merged.astype(str)
+    return merged
+
+
+def _tmp(path: Path, name: str) -> Path:
+    return path / f"{name}.tmp"
+
+
+def _replace(path: Path, name: str) -> None:
+    """Rename the temporary file of `name` over it."""
+    os.replace(_tmp(path, name), path / name)
+
+
+def _save_ids(path: Path, ids: npt.NDArray[Any]) -> None:
+    # np.save appends ".npy" to a path not ending in it, so pass a file
+    with open(_tmp(path, _IDS), "wb") as f:
+        np.save(f, ids, allow_pickle=False)
+    _replace(path, _IDS)
+
+
+def _write_meta(path: Path, meta: dict[str, Any]) -> None:
+    with open(_tmp(path, _META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, default=_json_value)
+    _replace(path, _META)
+
+
+def pairwise_distances(
+    block: codec.FloatArray,
+    norms: codec.FloatArray,
+    queries: codec.FloatArray,
+    metric: SearchMetric,
+    zero_distance: float = np.inf,
+) -> codec.FloatArray:
+    """``(len(block), len(queries))`` distances, as pgvector computes them.
+
+    `norms` are the row norms of `block`. Cosine distances involving a zero
+    vector, NaN in pgvector, are `zero_distance`: by default such rows never
+    rank.
+    """
+    if metric == SearchMetric.L1_DISTANCE:
+        # no matrix product for L1; small chunks bound the (rows, dim) temporary
+        distances = np.empty((len(block), len(queries)), dtype=np.float32)
+        for start in range(0, len(block), _L1_CHUNK_SIZE):
+            chunk = block[start : start + _L1_CHUNK_SIZE]
+            for i, query in enumerate(queries):
+                distances[start : start + len(chunk), i] = np.abs(chunk - query).sum(
+                    axis=1
+                )
+        return distances
+    products = block @ queries.T
+    if metric == SearchMetric.INNER_PRODUCT:
+        return np.negative(products, out=products)
+    query_norms = np.linalg.norm(queries, axis=1)
+    if metric == SearchMetric.COSINE_DISTANCE:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            products /= norms[:, None] * query_norms[None, :]
+        distances = np.subtract(1, products, out=products)
+        distances[np.isnan(distances)] = zero_distance
+        return distances
+    squared = norms[:, None] ** 2 - 2 * products + query_norms[None, :] ** 2
+    return np.sqrt(np.maximum(squared, 0, out=squared), out=squared)
+
+
+def _top_k(distances: codec.FloatArray, k: int) -> npt.NDArray[np.int64]:
+    """Per row, the positions of the `k` smallest `distances`, unordered."""
+    if distances.shape[1] <= k:
+        return np.broadcast_to(np.arange(distances.shape[1]), distances.shape).copy()
+    return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+def _top_k_merge(
+    best: tuple[npt.NDArray[np.int64], codec.FloatArray],
+    found: tuple[npt.NDArray[np.int64], codec.FloatArray],
+    k: int,
+) -> tuple[npt.NDArray[np.int64], codec.FloatArray]:
+    positions = np.concatenate((best[0], found[0]), axis=1)
+    distances = np.concatenate((best[1], found[1]), axis=1)
+    keep = _top_k(distances, k)
+    return (
+        np.take_along_axis(positions, keep, 1),
+        np.take_along_axis(distances, keep, 1),
+    )
@@ -0,0 +1,54 @@
+import numpy as np
+
+from vector_prisma.cache import NNCache, quantize
+
+QUERY = 'SELECT "id" FROM "Document" ORDER BY distance LIMIT $1'
+
+
+def _key(table_name: str = "Document", vec: list[float] = [1.0, 0.0]) -> bytes:
+    return NNCache.make_key(table_name, QUERY, [5, quantize(vec)])
+
+
+def test_hit_returns_copies_of_the_cached_rows() -> None:
+    cache = NNCache()
+    cache.put(_key(), "Document", [{"id": "a"}], cache.generation("Document"))
+    rows = cache.get(_key())
+    assert rows == [{"id": "a"}]
+    assert rows is not None
+    rows[0]["id"] = "changed"
+    assert cache.get(_key()) == [{"id": "a"}]
+    # float16 quantization maps near-identical query vectors to one key
+    assert cache.get(_key(vec=[1.0 + 1e-5, 0.0])) == [{"id": "a"}]
+    assert cache.stats().hits == 3
+
+
+def test_invalidate_drops_only_the_written_table() -> None:
+    cache = NNCache()
+    cache.put(_key(), "Document", [{"id": "a"}], cache.generation("Document"))
+    cache.put(_key("Passage"), "Passage", [{"id": "p"}], cache.generation("Passage"))
+    cache.invalidate("Document")
+    assert cache.get(_key()) is None
+    assert cache.get(_key("Passage")) == [{"id": "p"}]
+    assert cache.stats().invalidations == 1
+
+
+def test_results_of_a_search_that_raced_a_write_are_not_stored() -> None:
+    cache = NNCache()
+    generation = cache.generation("Document")
+    cache.invalidate("Document")  # a write lands while the search runs
+    cache.put(_key(), "Document", [{"id": "stale"}], generation)
+    assert cache.get(_key()) is None
+    assert cache.stats().entries == 0
+
+
+def test_entries_are_evicted_least_recently_used_first() -> None:
+    rows = [{"id": "a", "vec": np.zeros(64, dtype=np.float32)}]
+    cache = NNCache(max_bytes=1000)
+    first, second, third = (_key(vec=[float(i), 1.0]) for i in range(3))
+    cache.put(first, "Document", rows, 0)
+    cache.put(second, "Document", rows, 0)
+    assert cache.get(first) is not None
+    cache.put(third, "Document", rows, 0)
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+    assert cache.stats().evictions == 1
@@ -0,0 +1,41 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from vector_prisma import codec
+
+
+def test_decode_text_without_deprecation_warnings() -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        values = codec.decode_text("[1,2.5,-3e-2]", 3)
+    np.testing.assert_array_equal(values, np.array([1, 2.5, -0.03], np.float32))
+
+
+def test_malformed_vector_text_raises() -> None:
+    with pytest.raises(ValueError):
+        codec.decode_text("[1,abc]")
+    with pytest.raises(ValueError):
+        codec.decode_text("[1,2]", 3)
+
+
+def test_decode_matrix_rejects_null() -> None:
+    with pytest.raises(ValueError, match="NULL"):
+        codec.decode_matrix(["[1,2]", None])
+    with pytest.raises(ValueError, match="NULL"):
+        codec.decode_matrix([np.ones(2, np.float32), None])
+
+
+def test_decode_rows_passes_null_through() -> None:
+    assert codec.decode_rows(["[1,2]", None]) == [[1.0, 2.0], None]
+
+
+def test_halfvec_binary_round_trip() -> None:
+    data = codec.encode_halfvec_binary([1.0, -0.5, 65504.0])
+    assert len(data) == 4 + 3 * 2
+    np.testing.assert_array_equal(
+        codec.decode_halfvec_binary(data), np.array([1.0, -0.5, 65504.0], np.float32)
+    )
+    with pytest.raises(ValueError, match="halfvec"):
+        codec.decode_halfvec_binary(data[:-1])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from vector_prisma.diversity import mmr_select
+from vector_prisma.operations import SearchMetric
+from vector_prisma.snapshot import pairwise_distances
+
+
+def _vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def _distances(
+    vectors: np.ndarray, others: np.ndarray, metric: SearchMetric
+) -> np.ndarray:
+    return pairwise_distances(vectors, np.linalg.norm(vectors, axis=1), others, metric)
+
+
+def test_l1_distances_match_scalar_reference() -> None:
+    vectors, others = _vectors(7, 33, 0), _vectors(5, 33, 1)
+    distances = _distances(vectors, others, SearchMetric.L1_DISTANCE)
+    assert distances.shape == (7, 5)
+    for i, vec in enumerate(vectors):
+        for j, other in enumerate(others):
+            expected = sum(abs(float(a) - float(b)) for a, b in zip(vec, other))
+            assert distances[i, j] == pytest.approx(expected, rel=1e-5)
+
+
+@pytest.mark.parametrize("metric", list(SearchMetric))
+def test_mmr_without_diversity_keeps_distance_order(metric: SearchMetric) -> None:
+    vectors, query = _vectors(30, 16, 2), _vectors(1, 16, 3)
+    distances = _distances(vectors, query, metric)[:, 0]
+    picked = mmr_select(distances, vectors, 5, 1.0, metric)
+    assert picked.tolist() == np.argsort(distances)[:5].tolist()
+
+
+def test_mmr_skips_duplicates() -> None:
+    vectors = _vectors(20, 16, 4)
+    vectors[1] = vectors[0]
+    query = vectors[0] + 0.01
+    metric = SearchMetric.COSINE_DISTANCE
+    distances = _distances(vectors, query[None], metric)[:, 0]
+    picked = mmr_select(distances, vectors, 3, 0.5, metric)
+    assert picked[0] in (0, 1)
+    assert not {0, 1} <= set(picked.tolist())
+
+
+def test_mmr_does_not_favour_a_zero_vector() -> None:
+    vectors = np.array(
+        [[1, 0, 0], [1, 0.01, 0], [0, 1, 0], [0, 0, 0]], dtype=np.float32
+    )
+    query_distances = np.array([0.0, 0.01, 0.5, 0.9], dtype=np.float32)
+    picked = mmr_select(query_distances, vectors, 3, 0.5, SearchMetric.COSINE_DISTANCE)
+    assert picked.tolist()[:2] == [0, 2]
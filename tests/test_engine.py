@@ -0,0 +1,71 @@
+import asyncio
+import contextlib
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Optional, cast
+
+import pytest
+
+from vector_prisma.engine import NativeEngine, NativeTransaction
+
+
+class _Connection:
+    """Records statements; `ivfflat.probes` was set by the caller to "7"."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.log: list[str] = []
+
+    @contextlib.asynccontextmanager
+    async def _savepoint(self) -> AsyncIterator[None]:
+        self.log.append("SAVEPOINT")
+        try:
+            yield
+        except BaseException:
+            self.log.append("ROLLBACK TO SAVEPOINT")
+            raise
+        self.log.append("RELEASE SAVEPOINT")
+
+    def transaction(self) -> Any:
+        return self._savepoint()
+
+    async def fetchval(self, query: str, *values: Any) -> Optional[str]:
+        self.log.append(f"{query} {values}")
+        return "7"
+
+    async def execute(self, query: str, *values: Any) -> str:
+        self.log.append(f"{query} {values}")
+        return "SELECT 1"
+
+    async def fetch(self, query: str, *values: Any) -> list[dict[str, Any]]:
+        self.log.append(query)
+        if self.fail:
+            raise RuntimeError("operator does not exist")
+        return [{"id": 1}]
+
+
+def _client(conn: _Connection) -> Any:
+    transaction = NativeTransaction(cast(Any, None), cast(Any, conn), cast(Any, None))
+    return SimpleNamespace(_vector_transaction=transaction)
+
+
+def test_settings_in_a_transaction_are_restored() -> None:
+    conn = _Connection()
+    rows = asyncio.run(
+        NativeEngine().query(_client(conn), "SELECT 1", [], {"ivfflat.probes": "20"})
+    )
+    assert rows == [{"id": 1}]
+    assert conn.log[-2:] == [
+        "SELECT set_config($1, $2, true) ('ivfflat.probes', '7')",
+        "RELEASE SAVEPOINT",
+    ]
+
+
+def test_a_failing_statement_rolls_the_settings_back() -> None:
+    conn = _Connection(fail=True)
+    with pytest.raises(RuntimeError, match="operator does not exist"):
+        asyncio.run(
+            NativeEngine().query(
+                _client(conn), "SELECT 1", [], {"ivfflat.probes": "20"}
+            )
+        )
+    assert conn.log[-2:] == ["SELECT 1", "ROLLBACK TO SAVEPOINT"]
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from typing import Any
+
+import pytest
+from prisma.errors import RawQueryError
+
+from vector_prisma.execution import query_with_settings
+
+_RAW_ERROR = {
+    "error": "Raw query failed",
+    "user_facing_error": {
+        "error_code": "P2010",
+        "message": "Raw query failed. Code: `42883`.",
+        "meta": {"code": "42883", "message": "operator does not exist"},
+    },
+}
+
+
+class _Engine:
+    def __init__(self, batch_result: list[dict[str, Any]]) -> None:
+        self.batch_result = batch_result
+        self.payloads: list[dict[str, Any]] = []
+
+    async def query(self, content: str, tx_id: Any = None) -> Any:
+        self.payloads.append(json.loads(content))
+        return {"batchResult": self.batch_result}
+
+
+class _TransactionClient:
+    """A `tx()` client whose `ivfflat.probes` was set by the caller."""
+
+    _prisma_models: set[str] = set()
+    _relational_field_mappings: dict[str, Any] = {}
+    _tx_id = "tx"
+
+    def __init__(self, batch_result: list[dict[str, Any]]) -> None:
+        self._engine = _Engine(batch_result)
+
+    def is_transaction(self) -> bool:
+        return True
+
+    async def query_raw(self, query: str, *values: Any) -> list[dict[str, Any]]:
+        assert query == "SELECT current_setting($1, true) AS s1"
+        return [{"s1": "7"}]
+
+
+def _ok(result: Any) -> dict[str, Any]:
+    return {"data": {"result": result}}
+
+
+def test_settings_are_restored_to_the_previous_value() -> None:
+    rows = {"columns": ["id"], "types": ["int"], "rows": [[1]]}
+    client: Any = _TransactionClient([_ok(rows), _ok(rows), _ok(rows)])
+    result = asyncio.run(
+        query_with_settings(client, "SELECT 1 AS id", [], {"ivfflat.probes": "20"})
+    )
+    assert result == [{"id": 1}]
+    (payload,) = client._engine.payloads
+    assert payload["transaction"] is False
+    statements = [item["query"] for item in payload["batch"]]
+    assert "ivfflat.probes" in statements[0] and "20" in statements[0]
+    assert "set_config" in statements[2] and '\\"7\\"' in statements[2]
+    assert "RESET" not in statements[2]
+
+
+def test_a_failing_statement_raises_the_prisma_error() -> None:
+    client: Any = _TransactionClient(
+        [_ok(None), {"errors": [_RAW_ERROR]}, {"errors": [_RAW_ERROR]}]
+    )
+    with pytest.raises(RawQueryError):
+        asyncio.run(
+            query_with_settings(client, "SELECT 1", [], {"ivfflat.probes": "20"})
+        )
@@ -0,0 +1,67 @@
+from typing import Any
+
+from vector_prisma.generator.generator import Generator
+
+SCHEMA = """
+enum Status {
+  DRAFT
+  PUBLISHED
+}
+
+model Tenant {
+  id     String     @id @db.Uuid
+  chunks Document[]
+}
+
+model Document {
+  id         String                     @id @default(uuid()) @db.Uuid
+  tenant_id  String                     @db.Uuid
+  tenant     Tenant                     @relation(fields: [tenant_id], references: [id])
+  body       String
+  meta       Json
+  status     Status
+  views      BigInt?
+  vec        Unsupported("vector(3)")
+  created_at DateTime                   @default(now())
+}
+"""
+
+
+def _model() -> dict[str, Any]:
+    generator = Generator()
+    tables = generator.extract_tables_with_vector_type(SCHEMA)
+    (model,) = generator.transform_to_dmmf_format(tables)["datamodel"]["models"]
+    return model
+
+
+def test_scalar_and_enum_fields_are_columns() -> None:
+    model = _model()
+    assert model["columns"] == [
+        "id",
+        "tenant_id",
+        "body",
+        "meta",
+        "status",
+        "views",
+        "vec",
+        "created_at",
+    ]
+    assert model["uuid_columns"] == ["id", "tenant_id"]
+
+
+def test_column_types_cover_json_and_enum_fields() -> None:
+    column_types = _model()["column_types"]
+    assert column_types["meta"] == "jsonb"
+    assert column_types["status"] == '"Status"'
+    assert column_types["views"] == "bigint"
+    assert "tenant" not in column_types
+
+
+def test_vectors_template_renders_enum_types() -> None:
+    generator = Generator()
+    dmmf = generator.transform_to_dmmf_format(
+        generator.extract_tables_with_vector_type(SCHEMA)
+    )
+    source = generator.env.get_template("vectors.py.jinja").render(**dmmf)
+    assert '"status": "\\"Status\\"",' in source
+    compile(source, "vectors.py", "exec")
@@ -0,0 +1,86 @@
+from typing import Any
+
+import numpy as np
+import pytest
+
+from vector_prisma import ingest
+from vector_prisma.ingest import CopyReader, copy_rows, encode_copy_value
+
+
+def test_encode_copy_value() -> None:
+    assert encode_copy_value(None) == "\\N"
+    assert encode_copy_value(True) == "t"
+    assert encode_copy_value("a\tb\\c\nd") == "a\\tb\\\\c\\nd"
+    assert encode_copy_value(np.array([1, 2.5], np.float32)) == "[1,2.5]"
+    assert encode_copy_value({"k": 1}) == '{"k": 1}'
+
+
+def test_copy_reader_streams_lines_in_any_read_size() -> None:
+    rows = [{"id": str(i), "vec": [float(i), 0.0]} for i in range(50)]
+    reader = CopyReader(iter(rows), ("id", "vec"))
+    chunks = []
+    while chunk := reader.read(7):
+        chunks.append(chunk)
+    lines = "".join(chunks).splitlines()
+    assert len(lines) == 50
+    assert lines[3] == "3\t[3,0]"
+
+
+def test_copy_reader_rejects_rows_with_other_columns() -> None:
+    rows: list[dict[str, Any]] = [{"id": "a"}, {"id": "b", "vec": None}]
+    reader = CopyReader(iter(rows), ("id",))
+    with pytest.raises(ValueError, match="same columns"):
+        reader.read()
+
+
+class _Cursor:
+    def __init__(self, copies: list[tuple[str, str]]) -> None:
+        self.copies = copies
+        self.rowcount = 0
+
+    def __enter__(self) -> "_Cursor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def copy_expert(self, statement: str, reader: CopyReader) -> None:
+        data = reader.read()
+        self.copies.append((statement, data))
+        self.rowcount = data.count("\n")
+
+
+class _Connection:
+    def __init__(self) -> None:
+        self.copies: list[tuple[str, str]] = []
+        self.closed = False
+
+    def __enter__(self) -> "_Connection":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def cursor(self) -> _Cursor:
+        return _Cursor(self.copies)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_copy_rows_copies_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    conn = _Connection()
+    monkeypatch.setattr(ingest, "connect", lambda dsn: conn)
+    rows = ({"id": str(i), "vec": [float(i)]} for i in range(5))
+    assert copy_rows("dbname=x", "Item", rows, chunk_size=2) == [2, 2, 1]
+    statement, data = conn.copies[0]
+    assert statement == 'COPY "Item" ("id", "vec") FROM STDIN'
+    assert data == "0\t[0]\n1\t[1]\n"
+    assert conn.closed
+
+
+def test_copy_rows_without_rows_does_not_connect(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(ingest, "connect", None)
+    assert copy_rows("dbname=x", "Item", iter([])) == []
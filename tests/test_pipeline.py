@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, Optional, cast
+
+import pytest
+
+from vector_prisma.execution import BatchError
+from vector_prisma.pipeline import Deferred, PipelineError, StatementPipeline
+
+
+class _Engine:
+    """Answers a batch with each statement's position, failing at `fail_at`."""
+
+    text_vectors = True
+
+    def __init__(self, fail_at: Optional[int] = None) -> None:
+        self.fail_at = fail_at
+        self.batches: list[list[tuple[str, str, list[Any]]]] = []
+
+    async def batch(
+        self, client: Any, statements: list[tuple[str, str, list[Any]]]
+    ) -> list[Any]:
+        self.batches.append(statements)
+        if self.fail_at is not None and self.fail_at < len(statements):
+            raise BatchError(self.fail_at) from ValueError("duplicate key")
+        return [values[0] for _, _, values in statements]
+
+
+def _pipeline(engine: _Engine, size: int = 100) -> StatementPipeline:
+    return StatementPipeline(cast(Any, None), cast(Any, engine), size)
+
+
+def test_statements_are_sent_in_one_batch_when_awaited() -> None:
+    async def main() -> None:
+        engine = _Engine()
+        pipeline = _pipeline(engine)
+        first = await pipeline.enqueue("execute", "DELETE", [1], action="delete")
+        second = await pipeline.enqueue(
+            "query", "INSERT", [2], parse=lambda value: value * 10, action="create"
+        )
+        assert not first.done() and engine.batches == []
+        assert await second == 20
+        assert first.result() == 1
+        assert engine.batches == [
+            [("execute", "DELETE", [1]), ("query", "INSERT", [2])]
+        ]
+        assert len(pipeline) == 0
+
+    asyncio.run(main())
+
+
+def test_pipeline_flushes_when_full() -> None:
+    async def main() -> None:
+        engine = _Engine()
+        pipeline = _pipeline(engine, size=2)
+        for value in range(5):
+            await pipeline.enqueue("execute", "UPDATE", [value])
+        assert [len(batch) for batch in engine.batches] == [2, 2]
+        assert len(pipeline) == 1
+
+    asyncio.run(main())
+
+
+def test_failed_statement_names_its_position_and_action() -> None:
+    async def main() -> None:
+        engine = _Engine()
+        pipeline = _pipeline(engine, size=3)
+        for value in range(3):
+            await pipeline.enqueue("execute", "UPDATE", [value], action="update")
+        first = await pipeline.enqueue("execute", "INSERT", [3], action="create")
+        second = await pipeline.enqueue("query", "INSERT", [4], action="create")
+        engine.fail_at = 1
+        with pytest.raises(PipelineError) as info:
+            await pipeline.flush()
+        assert (info.value.index, info.value.action) == (4, "create")
+        assert isinstance(info.value.__cause__, ValueError)
+        with pytest.raises(PipelineError):
+            first.result()
+        # the transaction is doomed: nothing more is queued or sent
+        with pytest.raises(PipelineError):
+            await pipeline.enqueue("execute", "UPDATE", [5])
+        with pytest.raises(PipelineError):
+            await second
+        assert len(engine.batches) == 2
+
+    asyncio.run(main())
+
+
+def test_discard_fails_the_queued_statements() -> None:
+    async def main() -> None:
+        engine = _Engine()
+        pipeline = _pipeline(engine)
+        deferred = await pipeline.enqueue("execute", "UPDATE", [1])
+        pipeline.discard()
+        with pytest.raises(PipelineError, match="rolled back"):
+            deferred.result()
+        await pipeline.flush()
+        assert engine.batches == []
+
+    asyncio.run(main())
+
+
+def test_combine_waits_for_every_deferred_part() -> None:
+    async def main() -> None:
+        pipeline = _pipeline(_Engine())
+        first = await pipeline.enqueue("query", "INSERT", [[1, 2]])
+        second = await pipeline.enqueue("query", "INSERT", [[3]])
+        combined = Deferred.combine(
+            [first, [0], second], lambda parts: [x for part in parts for x in part]
+        )
+        assert isinstance(combined, Deferred) and not combined.done()
+        assert await combined == [1, 2, 0, 3]
+        assert Deferred.combine([[1], [2]], len) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,386 @@
+from typing import Any
+
+import numpy as np
+import pytest
+
+from vector_prisma.operations import Quantization, SearchMetric, get_pgvector_operation
+from vector_prisma.queries import QueryBuilder, normalize_order_by
+
+COLUMN_TYPES = {"id": "uuid", "tenant_id": "integer", "body": "text"}
+
+
+def test_where_parameters_are_cast_to_the_column_type() -> None:
+    query, values = QueryBuilder.build_find_query(
+        "Document",
+        ("id", "body"),
+        {"id": "0b6f8a8e-2f1c-4c36-9d55-4d7f0a3e6a10", "tenant_id": [1, 2]},
+        column_types=COLUMN_TYPES,
+    )
+    assert '"id" = $1::uuid' in query
+    assert '"tenant_id" IN ($2::integer, $3::integer)' in query
+    assert values == ["0b6f8a8e-2f1c-4c36-9d55-4d7f0a3e6a10", 1, 2]
+
+
+def test_where_parameters_without_a_known_type_are_not_cast() -> None:
+    query, _ = QueryBuilder.build_nn_query(
+        "Document",
+        ("id", "body"),
+        [1.0, 0.0],
+        "vec",
+        5,
+        SearchMetric.L2_DISTANCE,
+        where={"body": "x", "other": 1},
+        column_types=COLUMN_TYPES,
+    )
+    assert '"body" = $3::text AND "other" = $4' in query
+
+
+def test_delete_where_is_cast() -> None:
+    query, _ = QueryBuilder.build_delete_query(
+        "Document", {"id": "x"}, column_types=COLUMN_TYPES
+    )
+    assert query == 'DELETE FROM "Document" WHERE "id" = $1::uuid'
+
+
+def test_grouped_parameters_follow_a_list_where() -> None:
+    query, values = QueryBuilder.build_grouped_query(
+        "Document",
+        ("id", "body"),
+        "id",
+        [1.0, 0.0],
+        "vec",
+        "tenant_id",
+        3,
+        SearchMetric.L2_DISTANCE,
+        where={"tenant_id": [1, 2]},
+        column_types=COLUMN_TYPES,
+    )
+    assert "IN ($3::integer, $4::integer)" in query
+    assert "LIMIT $5" in query
+    assert values[4:] == [30, 1]
+
+
+def test_update_casts_uuid_set_columns_and_where() -> None:
+    query, values = QueryBuilder.build_update_query(
+        "Document",
+        {"id": "a"},
+        {"tenant_id": 3, "owner_id": "b"},
+        ("id",),
+        uuid_columns={"id", "owner_id"},
+        column_types={**COLUMN_TYPES, "owner_id": "uuid"},
+    )
+    assert query == (
+        'UPDATE "Document" SET "tenant_id" = $1, "owner_id" = $2::uuid '
+        'WHERE "id" = $3::uuid RETURNING "id"'
+    )
+    assert values == [3, "b", "a"]
+
+
+def test_empty_list_filter_matches_no_row() -> None:
+    query, values = QueryBuilder.build_find_query(
+        "Document", ("id",), {"id": [], "body": "x"}, column_types=COLUMN_TYPES
+    )
+    assert query == 'SELECT "id" FROM "Document" WHERE FALSE AND "body" = $1::text'
+    assert values == ["x"]
+
+
+def test_insert_many_numbers_and_casts_every_row() -> None:
+    query, values = QueryBuilder.build_insert_many_query(
+        "Document",
+        [{"id": "a", "vec": [1.0, 2.0]}, {"id": "b", "vec": [3.0, 4.0]}],
+        uuid_columns={"id"},
+        vector_columns={"vec"},
+        conflict_target=["id"],
+        returning=True,
+    )
+    assert query == (
+        'INSERT INTO "Document" ("id", "vec") '
+        "VALUES ($1::uuid, $2::vector), ($3::uuid, $4::vector) "
+        'ON CONFLICT ("id") DO UPDATE SET "id" = EXCLUDED."id", '
+        '"vec" = EXCLUDED."vec" RETURNING "id", "vec"::text'
+    )
+    assert values == ["a", "[1,2]", "b", "[3,4]"]
+
+
+def test_insert_many_rejects_rows_with_other_columns() -> None:
+    with pytest.raises(ValueError, match="same columns"):
+        QueryBuilder.build_insert_many_query("Document", [{"id": "a"}, {"b": 1}])
+
+
+def test_nn_many_binds_all_query_vectors_as_one_array() -> None:
+    query, values = QueryBuilder.build_nn_many_query(
+        "Document",
+        ("id", "vec"),
+        [[1.0, 0.0], [0.0, 1.0]],
+        "vec",
+        3,
+        SearchMetric.COSINE_DISTANCE,
+        where={"tenant_id": 1},
+        column_types=COLUMN_TYPES,
+    )
+    assert "FROM unnest($1::text::vector[]) WITH ORDINALITY" in query
+    assert 'WHERE "tenant_id" = $3::integer ORDER BY distance LIMIT $2' in query
+    assert query.endswith("ORDER BY q.ordinality, c.distance")
+    assert values == ['{"[1,0]","[0,1]"}', 3, 1]
+
+
+def test_nn_query_binds_the_vector_and_reuses_the_statement() -> None:
+    first, values = QueryBuilder.build_nn_query(
+        "Document", ("id",), [0.5, 1.0], "vec", 5, SearchMetric.L2_DISTANCE
+    )
+    second, _ = QueryBuilder.build_nn_query(
+        "Document", ("id",), [0.25, -2.0], "vec", 5, SearchMetric.L2_DISTANCE
+    )
+    assert first is second
+    assert '"vec" <-> $2::vector AS distance' in first
+    assert "0.5" not in first
+    assert values == [5, "[0.5,1]"]
+
+
+def test_nn_query_binds_float32_arrays_for_the_native_engine() -> None:
+    _, values = QueryBuilder.build_nn_query(
+        "Document",
+        ("id",),
+        [0.5, 1.0],
+        "vec",
+        5,
+        SearchMetric.L2_DISTANCE,
+        text_vectors=False,
+    )
+    assert isinstance(values[1], np.ndarray)
+    assert values[1].dtype == np.float32
+    np.testing.assert_array_equal(values[1], [0.5, 1.0])
+
+
+def test_literal_operation_uses_the_compact_encoding() -> None:
+    assert get_pgvector_operation("vec", [0.5, 1.0], SearchMetric.L2_DISTANCE) == (
+        "vec <-> '[0.5,1]'"
+    )
+
+
+def test_keyset_page_uses_a_row_comparison_for_one_direction() -> None:
+    order = normalize_order_by(
+        [{"tenant_id": "asc"}, {"id": "asc"}], ("id", "tenant_id")
+    )
+    query, values = QueryBuilder.build_find_query(
+        "Document",
+        ("id",),
+        {"body": "x"},
+        order=order,
+        take=100,
+        after=[7, "0b6f8a8e-2f1c-4c36-9d55-4d7f0a3e6a10"],
+        column_types=COLUMN_TYPES,
+    )
+    assert query.endswith(
+        'WHERE "body" = $1::text AND ("tenant_id", "id") > ($2::integer, $3::uuid) '
+        'ORDER BY "tenant_id" ASC, "id" ASC LIMIT $4'
+    )
+    assert values == ["x", 7, "0b6f8a8e-2f1c-4c36-9d55-4d7f0a3e6a10", 100]
+
+
+def test_keyset_page_expands_mixed_directions() -> None:
+    order = normalize_order_by(
+        [{"tenant_id": "desc"}, {"id": "asc"}], ("id", "tenant_id")
+    )
+    query, _ = QueryBuilder.build_find_query(
+        "Document", ("id",), order=order, after=[7, "a"], column_types=COLUMN_TYPES
+    )
+    assert (
+        'WHERE (("tenant_id" < $1::integer) '
+        'OR ("tenant_id" = $1::integer AND "id" > $2::uuid))'
+    ) in query
+
+
+def test_keyset_page_needs_one_value_per_order_column() -> None:
+    with pytest.raises(ValueError, match="one value per order column"):
+        QueryBuilder.build_find_query(
+            "Document", ("id",), order=(("id", "asc"),), after=["a", 1]
+        )
+
+
+def test_order_by_rejects_unknown_columns_and_directions() -> None:
+    assert normalize_order_by({"id": "desc"}, ("id",)) == (("id", "desc"),)
+    with pytest.raises(ValueError, match="unknown column 'body'"):
+        normalize_order_by({"body": "asc"}, ("id",))
+    with pytest.raises(ValueError, match="'up'"):
+        normalize_order_by({"id": "up"}, ("id",))
+
+
+def test_rerank_orders_candidates_by_the_quantized_distance() -> None:
+    query, values = QueryBuilder.build_nn_rerank_query(
+        "Document",
+        ("id",),
+        [1.0, 0.0],
+        "vec",
+        5,
+        SearchMetric.COSINE_DISTANCE,
+        40,
+        Quantization.BINARY,
+        2,
+        where={"tenant_id": 1},
+        max_distance=0.5,
+        column_types=COLUMN_TYPES,
+    )
+    assert query == (
+        'SELECT "id", "vec" <=> $2::vector AS distance FROM ('
+        'SELECT "id", "vec" FROM "Document" WHERE "tenant_id" = $3::integer '
+        'ORDER BY binary_quantize("vec")::bit(2) <~> binary_quantize($2::vector)::bit(2) '
+        'LIMIT $5) AS c WHERE "vec" <=> $2::vector < $4 ORDER BY distance LIMIT $1'
+    )
+    assert values == [5, "[1,0]", 1, 0.5, 40]
+
+
+def test_rerank_on_a_halfvec_column_binds_a_halfvec_query() -> None:
+    query, _ = QueryBuilder.build_nn_rerank_query(
+        "Document",
+        ("id",),
+        [1.0, 0.0],
+        "vec",
+        5,
+        SearchMetric.L2_DISTANCE,
+        40,
+        Quantization.HALFVEC,
+        2,
+        vector_type="halfvec",
+    )
+    assert '"vec" <-> $2::halfvec AS distance' in query
+    assert 'ORDER BY "vec"::halfvec(2) <-> $2::halfvec::halfvec(2) LIMIT $3' in query
+
+
+def test_rerank_needs_at_least_top_k_candidates() -> None:
+    with pytest.raises(ValueError, match="candidates"):
+        QueryBuilder.build_nn_rerank_query(
+            "Document",
+            ("id",),
+            [1.0, 0.0],
+            "vec",
+            5,
+            SearchMetric.L2_DISTANCE,
+            4,
+            Quantization.HALFVEC,
+            2,
+        )
+
+
+def test_hybrid_fuses_both_rankings_in_one_statement() -> None:
+    query, values = QueryBuilder.build_hybrid_query(
+        "Document",
+        ("id", "body"),
+        "id",
+        [1.0, 0.0],
+        "vec",
+        "cats",
+        "body",
+        5,
+        SearchMetric.COSINE_DISTANCE,
+        weights=(2, 1),
+        where={"tenant_id": 1},
+        column_types=COLUMN_TYPES,
+    )
+    # both searches share the filter parameters and the candidate limit
+    assert '"vec" <=> $2::vector AS distance' in query
+    assert query.count('"tenant_id" = $3::integer') == 2
+    assert "websearch_to_tsquery('simple'::regconfig, $4::text)" in query
+    assert query.count("LIMIT $5") == 2
+    assert (
+        "COALESCE($6::float8 / ($8::int + s.rank), 0) + "
+        "COALESCE($7::float8 / ($8::int + l.rank), 0) AS score"
+    ) in query
+    assert "FULL OUTER JOIN lexical AS l ON l.key = s.key" in query
+    assert query.endswith("ORDER BY score DESC LIMIT $1")
+    assert values == [5, "[1,0]", 1, "cats", 20, 2.0, 1.0, 60]
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"candidates": 4}, "candidates"),
+        ({"fusion": "linear"}, "linear"),
+        ({"text_config": "simple'); DROP TABLE x; --"}, "text search configuration"),
+    ],
+)
+def test_hybrid_rejects_invalid_options(options: dict[str, Any], message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        QueryBuilder.build_hybrid_query(
+            "Document",
+            ("id",),
+            "id",
+            [1.0, 0.0],
+            "vec",
+            "cats",
+            "body",
+            5,
+            SearchMetric.L2_DISTANCE,
+            **options,
+        )
+
+
+def test_delete_many_binds_a_list_as_one_array() -> None:
+    query, values = QueryBuilder.build_delete_many_query(
+        "Document", {"id": ("a", "b"), "tenant_id": 1}, column_types=COLUMN_TYPES
+    )
+    assert query == (
+        'DELETE FROM "Document" '
+        'WHERE "id" = ANY($1::uuid[]) AND "tenant_id" = $2::integer'
+    )
+    assert values == [["a", "b"], 1]
+    # the statement does not depend on how many ids are deleted
+    other, _ = QueryBuilder.build_delete_many_query(
+        "Document", {"id": ["c"], "tenant_id": 2}, column_types=COLUMN_TYPES
+    )
+    assert other is query
+
+
+def test_update_many_sets_the_same_values_on_every_match() -> None:
+    query, values = QueryBuilder.build_update_many_query(
+        "Document",
+        {"id": ["a", "b"]},
+        {"body": "x", "vec": [1.0, 0.0]},
+        vector_columns={"vec"},
+        column_types=COLUMN_TYPES,
+    )
+    assert query == (
+        'UPDATE "Document" SET "body" = $1, "vec" = $2::vector '
+        'WHERE "id" = ANY($3::uuid[])'
+    )
+    assert values == ["x", "[1,0]", ["a", "b"]]
+    with pytest.raises(ValueError, match="Nothing to update"):
+        QueryBuilder.build_update_many_query("Document", {"id": ["a"]}, {})
+
+
+def test_update_rows_gives_each_row_its_own_values() -> None:
+    query, values = QueryBuilder.build_update_rows_query(
+        "Document",
+        [
+            {"id": "a", "body": "x", "vec": [1.0, 0.0]},
+            {"id": "b", "body": "y", "vec": None},
+        ],
+        ["id"],
+        where={"tenant_id": 1},
+        uuid_columns={"id"},
+        vector_columns={"vec"},
+        column_types=COLUMN_TYPES,
+    )
+    assert query == (
+        'UPDATE "Document" AS t SET "body" = v."body", "vec" = v."vec" '
+        "FROM (VALUES ($1::uuid, $2::text, $3::vector), ($4, $5, $6)) "
+        'AS v("id", "body", "vec") '
+        'WHERE t."id" = v."id" AND t."tenant_id" = $7::integer'
+    )
+    assert values == ["a", "x", "[1,0]", "b", "y", None, 1]
+
+
+@pytest.mark.parametrize(
+    "rows, message",
+    [
+        ([], "At least one row"),
+        ([{"body": "x"}], "must provide id"),
+        ([{"id": "a"}], "Nothing to update"),
+        ([{"id": "a", "body": "x"}, {"id": "b"}], "same columns"),
+    ],
+)
+def test_update_rows_rejects_invalid_rows(
+    rows: list[dict[str, Any]], message: str
+) -> None:
+    with pytest.raises(ValueError, match=message):
+        QueryBuilder.build_update_rows_query("Document", rows, ["id"])
@@ -0,0 +1,49 @@
+from typing import Any
+
+import numpy as np
+
+from vector_prisma.queries import QUERY_INDEX_COLUMN
+from vector_prisma.results import VectorBatch, record_type, to_records
+
+
+def test_batched_search_rows_split_per_query() -> None:
+    # rows of retrieve_many, ordered by query index; query 2 found nothing
+    rows: list[dict[str, Any]] = [
+        {QUERY_INDEX_COLUMN: 1, "id": "a", "vec": "[1,0]", "distance": 0.1},
+        {QUERY_INDEX_COLUMN: 1, "id": "b", "vec": "[0,1]", "distance": 0.2},
+        {QUERY_INDEX_COLUMN: 3, "id": "c", "vec": "[1,1]", "distance": 0.3},
+    ]
+    groups = np.array([row[QUERY_INDEX_COLUMN] - 1 for row in rows])
+    batches = VectorBatch.from_rows(rows, "id", "vec", with_distance=True).split(
+        groups, 3
+    )
+    assert [batch.ids.tolist() for batch in batches] == [["a", "b"], [], ["c"]]
+    np.testing.assert_array_equal(batches[2].vectors, [[1.0, 1.0]])
+    assert batches[0].distances is not None
+    np.testing.assert_allclose(batches[0].distances, [0.1, 0.2])
+    assert batches[1].vectors.shape == (0, 2)
+
+
+def test_records_decode_vector_columns() -> None:
+    record = record_type("DocumentRecord", ("id", "vec"))
+    assert record_type("DocumentRecord", ("id", "vec")) is record
+    records = to_records(
+        [{"id": "a", "vec": "[1,2]", "body": "x"}, {"id": "b", "vec": "[3,4]"}],
+        record,
+        frozenset({"vec"}),
+    )
+    assert [r.id for r in records] == ["a", "b"]
+    assert records[0].vec.dtype == np.float32
+    np.testing.assert_array_equal(records[1].vec, [3.0, 4.0])
+
+
+def test_records_keep_null_vectors() -> None:
+    record = record_type("DocumentRecord", ("id", "vec"))
+    records = to_records(
+        [{"id": "a", "vec": None}, {"id": "b", "vec": "[3,4]"}],
+        record,
+        frozenset({"vec"}),
+    )
+    assert records[0].vec is None
+    np.testing.assert_array_equal(records[1].vec, [3.0, 4.0])
+    assert to_records([], record) == []
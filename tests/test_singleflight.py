@@ -0,0 +1,103 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from vector_prisma.singleflight import SingleFlight
+
+
+class _Search:
+    """A search that returns its call number once `release` is set."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> list[dict[str, Any]]:
+        self.calls += 1
+        call = self.calls
+        await self.release.wait()
+        return [{"id": "a", "call": call}]
+
+
+def test_concurrent_identical_searches_share_one_result() -> None:
+    async def main() -> None:
+        flight = SingleFlight()
+        search = _Search()
+        tasks = [
+            asyncio.create_task(flight.run(b"key", "Document", search))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        search.release.set()
+        results = await asyncio.gather(*tasks)
+        assert search.calls == 1
+        assert [shared for _, shared in results] == [False, True, True]
+        assert all(rows == [{"id": "a", "call": 1}] for rows, _ in results)
+        # every caller gets its own rows to modify
+        assert results[0][0][0] is not results[1][0][0]
+        stats = flight.stats()
+        assert (stats.leaders, stats.coalesced, stats.in_flight) == (1, 2, 0)
+
+    asyncio.run(main())
+
+
+def test_searches_after_a_write_do_not_join_the_stale_one() -> None:
+    async def main() -> None:
+        flight = SingleFlight()
+        search = _Search()
+        leader = asyncio.create_task(flight.run(b"key", "Document", search))
+        await asyncio.sleep(0)
+        flight.forget("Document")
+        follower = asyncio.create_task(flight.run(b"key", "Document", search))
+        await asyncio.sleep(0)
+        search.release.set()
+        assert (await leader)[1] is False
+        rows, shared = await follower
+        assert shared is False and rows[0]["call"] == 2
+
+    asyncio.run(main())
+
+
+def test_follower_searches_itself_after_max_wait() -> None:
+    async def main() -> None:
+        flight = SingleFlight(max_wait=0.01)
+        slow = _Search()
+        leader = asyncio.create_task(flight.run(b"key", "Document", slow))
+        await asyncio.sleep(0)
+        fast = _Search()
+        fast.release.set()
+        rows, shared = await flight.run(b"key", "Document", fast)
+        assert shared is False and fast.calls == 1
+        assert flight.stats().timeouts == 1
+        slow.release.set()
+        await leader
+
+    asyncio.run(main())
+
+
+def test_followers_see_the_leader_error() -> None:
+    async def main() -> None:
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def failing() -> list[dict[str, Any]]:
+            await release.wait()
+            raise RuntimeError("connection lost")
+
+        tasks = [
+            asyncio.create_task(flight.run(b"key", "Document", failing))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats().in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_max_wait_must_be_positive() -> None:
+    with pytest.raises(ValueError, match="max_wait"):
+        SingleFlight(max_wait=0)
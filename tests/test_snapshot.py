@@ -0,0 +1,92 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import numpy as np
+import pytest
+
+from vector_prisma.results import VectorBatch
+from vector_prisma.snapshot import VectorSnapshot
+
+
+class _Meta:
+    TABLE_NAME = "Document"
+    ID_COLUMN = "id"
+    VECTOR_TYPES = {"vec": "vector"}
+    VECTOR_DIMS = {"vec": 3}
+
+
+class _Source:
+    """In-memory stand-in for the generated actions, ordered by (changed, id)."""
+
+    _meta = _Meta
+
+    def __init__(self) -> None:
+        self.rows: dict[str, dict[str, Any]] = {}
+        self.clock = 0
+        self.fail_after: Optional[int] = None
+
+    def write(self, key: str, vec: list[float]) -> None:
+        self.clock += 1
+        self.rows[key] = {"id": key, "vec": vec, "changed": self.clock}
+
+    def _ordered(self) -> list[dict[str, Any]]:
+        return sorted(self.rows.values(), key=lambda row: (row["changed"], row["id"]))
+
+    async def find_many(self, where: Any = None, **kwargs: Any) -> Any:
+        return [SimpleNamespace(**row) for row in self._ordered()[::-1][:1]]
+
+    async def find_iter(self, where: Any = None, **kwargs: Any) -> Any:
+        after, batch_size = kwargs.get("after"), kwargs["batch_size"]
+        rows = [
+            row
+            for row in self._ordered()
+            if after is None or [row["changed"], row["id"]] > after
+        ]
+        for start in range(0, len(rows), batch_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise ConnectionError("connection lost")
+            yield VectorBatch.from_rows(rows[start : start + batch_size], "id", "vec")
+
+
+def test_refresh_replaces_files_and_keeps_old_mappings(tmp_path: Path) -> None:
+    source = _Source()
+    for i in range(5):
+        source.write(f"r{i}", [float(i), 1.0, 0.0])
+    snapshot = asyncio.run(
+        VectorSnapshot.export(source, tmp_path, changed_column="changed", batch_size=2)
+    )
+    assert snapshot.ids.tolist() == ["r0", "r1", "r2", "r3", "r4"]
+
+    source.write("r1", [9.0, 9.0, 9.0])
+    source.write("r5", [5.0, 1.0, 0.0])
+    reader = VectorSnapshot(tmp_path)
+    assert asyncio.run(snapshot.refresh(source, batch_size=2)) == 2
+
+    assert snapshot.ids.tolist() == ["r0", "r1", "r2", "r3", "r4", "r5"]
+    np.testing.assert_array_equal(snapshot.vectors[1], [9.0, 9.0, 9.0])
+    np.testing.assert_allclose(snapshot.norms[5], np.linalg.norm([5.0, 1.0, 0.0]))
+    # a reader keeps the files it mapped until it reloads
+    np.testing.assert_array_equal(reader.vectors[1], [1.0, 1.0, 0.0])
+    assert reader.reload()
+    np.testing.assert_array_equal(reader.vectors[1], [9.0, 9.0, 9.0])
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_failed_refresh_keeps_the_snapshot_usable(tmp_path: Path) -> None:
+    source = _Source()
+    source.write("r0", [1.0, 0.0, 0.0])
+    snapshot = asyncio.run(
+        VectorSnapshot.export(source, tmp_path, changed_column="changed")
+    )
+    source.write("r1", [0.0, 1.0, 0.0])
+    source.write("r2", [0.0, 0.0, 1.0])
+    source.fail_after = 1
+    with pytest.raises(ConnectionError):
+        asyncio.run(snapshot.refresh(source, batch_size=1))
+
+    source.fail_after = None
+    assert asyncio.run(snapshot.refresh(source, batch_size=1)) == 2
+    assert snapshot.ids.tolist() == ["r0", "r1", "r2"]
+    np.testing.assert_array_equal(snapshot.vectors[2], [0.0, 0.0, 1.0])